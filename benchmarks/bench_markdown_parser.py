@@ -0,0 +1,88 @@
+"""Measure MdParser throughput (MB/s) on synthetic markdown notes.
+
+Usage:
+    python -m benchmarks.bench_markdown_parser --sizes-mb 1 10 50
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from llmass.utils.markdown import MdParser
+
+
+WORDS = (
+    "inference", "attention", "kernel", "latency", "throughput", "cache", "batch", "token",
+    "заметка", "проект", "студент", "задача", "встреча", "статья", "модель", "данные",
+)
+
+
+def generate_markdown(size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = ["# Notes\n", "\n"]
+    n_bytes = 0
+    while n_bytes < size_bytes:
+        level = rng.choice((2, 3, 3, 4))
+        lines.append("#" * level + " " + " ".join(rng.choices(WORDS, k=4)) + "\n")
+        for _ in range(rng.randint(1, 12)):
+            line = " ".join(rng.choices(WORDS, k=rng.randint(0, 20))) + "\n"
+            lines.append(line)
+            n_bytes += len(line.encode("utf-8"))
+    return "".join(lines)
+
+
+def generate_study_markdown(size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = ["# Subject\n", "\n", "## Current state\n", "| Topic | Status |\n", "|---|---|\n"]
+    n_bytes = 0
+    while n_bytes < size_bytes // 2:
+        line = f"| {' '.join(rng.choices(WORDS, k=3))} | {rng.choice(WORDS)} |\n"
+        lines.append(line)
+        n_bytes += len(line.encode("utf-8"))
+    lines.append("## Notes\n")
+    day = 0
+    while n_bytes < size_bytes:
+        day += 1
+        lines.append(f"### 2024.01.{day % 28 + 1:02d}\n")
+        line = " ".join(rng.choices(WORDS, k=30)) + "\n"
+        lines.append(line)
+        n_bytes += len(line.encode("utf-8"))
+    return "".join(lines)
+
+
+def measure(func, n_repeats: int) -> float:
+    best = float("inf")
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1.0, 10.0])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size_mb in args.sizes_mb:
+            size_bytes = int(size_mb * 1024 * 1024)
+
+            notes_path = Path(tmp_dir) / "notes.md"
+            notes_path.write_text(generate_markdown(size_bytes), encoding="utf-8")
+            real_size_mb = notes_path.stat().st_size / 1024 / 1024
+            t = measure(lambda: sum(1 for _ in MdParser(notes_path, {}).iter_sections()), args.repeats)
+            print(f"sections   {real_size_mb:8.1f} MB  {t:8.3f} s  {real_size_mb / t:8.1f} MB/s")
+
+            study_path = Path(tmp_dir) / "study.md"
+            study_path.write_text(generate_study_markdown(size_bytes), encoding="utf-8")
+            real_size_mb = study_path.stat().st_size / 1024 / 1024
+            schema = {"current_state": "table", "notes": "dated_notes"}
+            t = measure(lambda: MdParser(study_path, schema).parse(), args.repeats)
+            print(f"parse      {real_size_mb:8.1f} MB  {t:8.3f} s  {real_size_mb / t:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
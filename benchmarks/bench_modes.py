@@ -0,0 +1,281 @@
+"""Benchmark the modes end-to-end against the mock LLM server.
+
+For every size of the synthetic fixtures (see benchmarks/fixtures.py) the
+non-interactive parts of the modes are run against a local mock server
+(benchmarks/mock_llm_server.py) with the given latency, decoding speed,
+number of slots and error rate:
+
+* search_<ranker>: indexing the collection and answering --n-queries queries,
+  once per ranker (embeddings, bm25 and none, i.e. verifying every section);
+* recent_papers: classifying the papers of three RSS feeds;
+* interaction and interaction_stream: --n-queries questions about a note,
+  as in warmup, relax and projects, with and without streaming.
+
+With --n-servers N, the chat requests are balanced across N such servers
+(llm_server_url lists all of them) to see how throughput scales with them.
+
+Wall time, requests issued, tokens sent and received and p50/p95 latency of
+the requests (measured by the server, queueing included) are printed and saved
+as JSON. Pass a previous output as --baseline to compare against it.
+
+Usage:
+    python -m benchmarks.bench_modes --sizes small medium --output bench_modes.json
+    python -m benchmarks.bench_modes --sizes small --baseline bench_modes.json --latency-ms 200
+    python -m benchmarks.bench_modes --modes search_none recent_papers --n-servers 2
+"""
+import argparse
+from datetime import datetime
+import json
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable
+
+from hydra import compose, initialize_config_dir
+from omegaconf import DictConfig
+
+from benchmarks.fixtures import SIZES, generate_collection, generate_rss_feeds
+from benchmarks.bench_markdown_parser import generate_markdown
+from benchmarks.mock_llm_server import MockLlmServer
+from llmass.client import LlmClient
+from llmass.interaction import compose_messages
+from llmass.papers import run_recent_papers_pipeline
+from llmass.scripts.llm_runner import CONFIG_NAME
+from llmass.search import SearchableCollection
+from llmass.utils.common import get_config_path, get_project_path
+
+
+MODES = ("search_embeddings", "search_bm25", "search_none", "recent_papers", "interaction", "interaction_stream")
+QUERIES = ("attention kernel latency", "студент проект задача", "cache throughput batch", "статья модель данные")
+
+
+def compose_config(work_dir: Path, servers: list[MockLlmServer], collection_path: Path) -> DictConfig:
+    with initialize_config_dir(config_dir=str(get_config_path()), version_base="1.3"):
+        cfg = compose(
+            config_name=CONFIG_NAME,
+            overrides=[
+                f"user_settings.project_path={work_dir}",
+                f"llm_embeddings_url={servers[0].base_url}/embeddings",
+                "response_cache.enabled=false",  # every run must reach the server
+                "telemetry.enabled=false",  # the server records the calls
+            ],
+        )
+    cfg.llm_server_url = [f"{server.base_url}/chat/completions" for server in servers]
+    cfg.user_settings.markdown_collections = {
+        "bench": {"path": str(collection_path), "description": "Synthetic notes"},
+    }
+    return cfg
+
+
+def run_search(cfg: DictConfig, llm_client: LlmClient, ranker: str, n_queries: int) -> dict[str, Any]:
+    cfg.search.ranker = None if ranker == "none" else ranker
+    searchable_collection = SearchableCollection.from_config("bench", cfg, llm_client)
+    start_time = time.perf_counter()
+    searchable_collection.refresh()
+    n_found = 0
+    for query in (QUERIES * n_queries)[:n_queries]:
+        n_found += len(searchable_collection.search(query, show_progress=False))
+    return {"indexing_time_s": time.perf_counter() - start_time, "n_found": n_found}
+
+
+def run_recent_papers(cfg: DictConfig, llm_client: LlmClient, feeds: list[Path]) -> dict[str, Any]:
+    counters = {"queued": 0, "relevant": 0}
+
+    def on_paper_queued(paper: dict[str, Any]) -> None:
+        counters["queued"] += 1
+
+    def on_paper_classified(paper: dict[str, Any], relevant: bool) -> None:
+        counters["relevant"] += relevant
+
+    run_recent_papers_pipeline(
+        rss_feed_urls=[feed.as_uri() for feed in feeds],
+        llm_client=llm_client,
+        prompts=cfg.prompts.recent_papers,
+        batching=cfg.batch_classification,
+        n_workers=cfg.llm_client.max_concurrent_requests,
+        on_paper_queued=on_paper_queued,
+        on_paper_classified=on_paper_classified,
+        decoding=cfg.classification,
+    )
+    return {"n_papers": counters["queued"], "n_relevant": counters["relevant"]}
+
+
+def run_interaction(
+    cfg: DictConfig,
+    llm_client: LlmClient,
+    note: str,
+    n_queries: int,
+    stream: bool,
+) -> dict[str, Any]:
+    prompts = cfg.prompts.warmup
+    times_to_first_token = []
+    for i in range(n_queries):
+        messages = compose_messages(
+            prompts.system_prompt,
+            prompts.user_prompt_prefix,
+            f"{prompts.user_prompt_question_at_startup} ({i})",
+            prompts.user_prompt_suffix,
+            note,
+            cfg.prompt_cache.document_first,
+        )
+        if stream:
+            chat_stream = llm_client.stream_chat(messages, use_cache=False)
+            for _ in chat_stream:
+                pass
+            times_to_first_token.append(chat_stream.time_to_first_token)
+        else:
+            llm_client.chat(messages, use_cache=False)
+
+    if not stream:
+        return {}
+    return {
+        "ttft_p50_ms": 1000 * _percentile(times_to_first_token, 50),
+        "ttft_p95_ms": 1000 * _percentile(times_to_first_token, 95),
+    }
+
+
+def run_benchmark(
+    mode: str,
+    size: str,
+    server_params: dict[str, Any],
+    n_queries: int,
+    fixtures_dir: Path,
+    n_servers: int = 1,
+) -> dict[str, Any]:
+    size_params = SIZES[size]
+    collection_path = fixtures_dir / size / "collection"
+    if not collection_path.exists():
+        generate_collection(collection_path, size_params["n_files"], size_params["file_size_kb"])
+    feeds = generate_rss_feeds(fixtures_dir / size / "feeds", size_params["n_papers"])
+
+    servers = [MockLlmServer(**server_params) for _ in range(n_servers)]
+    for server in servers:
+        server.start_in_background()
+    with tempfile.TemporaryDirectory() as work_dir:
+        cfg = compose_config(Path(work_dir), servers, collection_path)
+        llm_client = LlmClient.from_config(cfg)
+        run: Callable[[], dict[str, Any]]
+        if mode.startswith("search_"):
+            run = lambda: run_search(cfg, llm_client, mode[len("search_"):], n_queries)
+        elif mode == "recent_papers":
+            run = lambda: run_recent_papers(cfg, llm_client, feeds)
+        elif mode.startswith("interaction"):
+            note = generate_markdown(size_params["file_size_kb"] * 1024)
+            run = lambda: run_interaction(cfg, llm_client, note, n_queries, stream=mode == "interaction_stream")
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+
+        try:
+            start_time = time.perf_counter()
+            details = run()
+            wall_time = time.perf_counter() - start_time
+        finally:
+            llm_client.close()
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+
+    records = [record for server in servers for record in server.records()]
+    latencies = [r["latency_s"] for r in records if r["status"] == 200]
+    return {
+        "mode": mode,
+        "size": size,
+        "wall_time_s": wall_time,
+        "requests": len(records),
+        "chat_requests": sum(r["endpoint"] == "chat" for r in records),
+        "embedding_requests": sum(r["endpoint"] == "embeddings" for r in records),
+        "failed_requests": sum(r["status"] != 200 for r in records),
+        "prompt_tokens": sum(r["prompt_tokens"] for r in records),
+        "completion_tokens": sum(r["completion_tokens"] for r in records),
+        "latency_p50_ms": 1000 * _percentile(latencies, 50),
+        "latency_p95_ms": 1000 * _percentile(latencies, 95),
+        **details,
+    }
+
+
+def print_results(results: list[dict[str, Any]], baseline: dict[tuple[str, str], dict[str, Any]]) -> None:
+    print(
+        f"{'mode':<20} {'size':<7} {'wall, s':>9} {'requests':>9} {'failed':>7} {'prompt tok':>11} "
+        f"{'compl tok':>10} {'p50, ms':>9} {'p95, ms':>9}"
+    )
+    for result in results:
+        line = (
+            f"{result['mode']:<20} {result['size']:<7} {result['wall_time_s']:9.2f} {result['requests']:9d} "
+            f"{result['failed_requests']:7d} {result['prompt_tokens']:11d} {result['completion_tokens']:10d} "
+            f"{result['latency_p50_ms']:9.1f} {result['latency_p95_ms']:9.1f}"
+        )
+        baseline_result = baseline.get((result["mode"], result["size"]))
+        if baseline_result is not None and baseline_result["wall_time_s"] > 0:
+            line += (
+                f"  x{result['wall_time_s'] / baseline_result['wall_time_s']:.2f} wall time, "
+                f"{result['requests'] - baseline_result['requests']:+d} requests vs baseline"
+            )
+        print(line)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+def _git_revision() -> str:
+    proc = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=get_project_path(), capture_output=True, text=True
+    )
+    return proc.stdout.strip()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small"])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--n-queries", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--max-concurrent-requests", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--n-servers", type=int, default=1, help="mock servers to balance the chat requests across")
+    parser.add_argument("--fixtures-dir", type=Path, default=None, help="reuse generated fixtures between runs")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    args = parser.parse_args()
+
+    server_params = {
+        "latency_s": args.latency_ms / 1000,
+        "tokens_per_second": args.tokens_per_second,
+        "max_concurrent_requests": args.max_concurrent_requests,
+        "error_rate": args.error_rate,
+    }
+    baseline = {}
+    if args.baseline is not None:
+        baseline = {(r["mode"], r["size"]): r for r in json.loads(args.baseline.read_text())["results"]}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixtures_dir = args.fixtures_dir or Path(tmp_dir)
+        results = [
+            run_benchmark(mode, size, server_params, args.n_queries, fixtures_dir, args.n_servers)
+            for size in args.sizes
+            for mode in args.modes
+        ]
+
+    print_results(results, baseline)
+    if args.output is not None:
+        args.output.write_text(json.dumps({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "server": server_params,
+            "n_servers": args.n_servers,
+            "n_queries": args.n_queries,
+            "results": results,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measure the import time of the runner and of every mode with `python -X importtime`.
+
+Each module is imported in a fresh interpreter, the cumulative import time of
+the module and its heaviest top-level dependencies are reported. Hydra is
+measured too since it is imported only when the composed config is not cached.
+
+Usage:
+    python -m benchmarks.bench_startup --repeats 5 --top 8
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+
+MODULES = (
+    "llmass.scripts.llm_runner",
+    "llmass.modes.warmup",
+    "llmass.modes.relax",
+    "llmass.modes.projects",
+    "llmass.modes.study",
+    "llmass.modes.search",
+    "llmass.modes.recent_papers",
+    "llmass.server",
+    "hydra",
+)
+_IMPORTTIME_LINE_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure_import_time(module: str) -> dict[str, int]:
+    """Return the cumulative import time (us) of the module and of every package imported while importing it."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_LINE_PATTERN.match(line)
+        if m is not None:
+            entries.append((len(m.group(3)), m.group(4), int(m.group(2))))
+
+    # The output is in post-order: the imports done by the module are listed
+    # right before it and are indented deeper, e.g. site imported at startup is not
+    module_i = next(i for i, (_, name, _) in enumerate(entries) if name == module)
+    module_depth = entries[module_i][0]
+    cumulative_us = {module: entries[module_i][2]}
+    for depth, name, cumulative in reversed(entries[:module_i]):
+        if depth <= module_depth:
+            break
+        cumulative_us[name] = cumulative
+    return cumulative_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="number of heaviest top-level packages to show")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        runs = [measure_import_time(module) for _ in range(args.repeats)]
+        total_ms = statistics.median(run[module] for run in runs) / 1000
+        heaviest = sorted(
+            (
+                (statistics.median(run.get(name, 0) for run in runs) / 1000, name)
+                for name in runs[-1]
+                if "." not in name and name != module.split(".")[0]
+            ),
+            reverse=True,
+        )[:args.top]
+        print(f"{module:<30} {total_ms:8.1f} ms  (" + ", ".join(f"{name} {ms:.0f} ms" for ms, name in heaviest) + ")")
+
+
+if __name__ == "__main__":
+    main()
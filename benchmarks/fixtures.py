@@ -0,0 +1,74 @@
+"""Synthetic markdown collections and arXiv RSS feeds for the benchmarks."""
+from email.utils import format_datetime
+from datetime import datetime, timezone
+import random
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from benchmarks.bench_markdown_parser import WORDS, generate_markdown
+
+
+# Number of collection files, their size and number of RSS feed entries for every benchmark size
+SIZES = {
+    "small": {"n_files": 20, "file_size_kb": 8, "n_papers": 50},
+    "medium": {"n_files": 200, "file_size_kb": 16, "n_papers": 500},
+    "large": {"n_files": 1000, "file_size_kb": 32, "n_papers": 2000},
+}
+
+
+def generate_collection(root: Path, n_files: int, file_size_kb: float, seed: int = 0) -> Path:
+    """Write a collection of markdown notes spread over a few subdirectories."""
+    root.mkdir(parents=True, exist_ok=True)
+    for i in range(n_files):
+        subdir = root / f"topic_{i % 8}"
+        subdir.mkdir(exist_ok=True)
+        (subdir / f"note_{i:05d}.md").write_text(
+            generate_markdown(int(file_size_kb * 1024), seed=seed + i), encoding="utf-8"
+        )
+    return root
+
+
+def generate_rss_feed(path: Path, n_papers: int, seed: int = 0, first_id: int = 0) -> Path:
+    """Write an RSS feed formatted like the arXiv ones (rss.arxiv.org) with n_papers entries."""
+    rng = random.Random(seed)
+    pub_date = format_datetime(datetime(2025, 1, 1, tzinfo=timezone.utc))
+    items = []
+    for i in range(first_id, first_id + n_papers):
+        arxiv_id = f"2501.{i:05d}"
+        title = " ".join(rng.choices(WORDS, k=8)).capitalize()
+        abstract = " ".join(rng.choices(WORDS, k=rng.randint(120, 250)))
+        items.append(
+            "<item>"
+            f"<title>{escape(title)}</title>"
+            f"<link>https://arxiv.org/abs/{arxiv_id}</link>"
+            f"<description>{escape(f'arXiv:{arxiv_id}v1 Announce Type: new' + chr(10) + f'Abstract: {abstract}')}</description>"
+            f"<guid isPermaLink=\"false\">oai:arXiv.org:{arxiv_id}v1</guid>"
+            f"<pubDate>{pub_date}</pubDate>"
+            "</item>"
+        )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0"><channel>'
+        "<title>Synthetic arXiv feed</title><link>https://arxiv.org</link><description>Benchmark fixture</description>"
+        + "".join(items)
+        + "</channel></rss>",
+        encoding="utf-8",
+    )
+    return path
+
+
+def generate_rss_feeds(root: Path, n_papers: int, n_feeds: int = 3, seed: int = 0) -> list[Path]:
+    """Split n_papers between n_feeds feeds, a tenth of the papers are cross-listed in two feeds as on arXiv."""
+    n_per_feed = -(-n_papers // n_feeds)
+    n_cross_listed = n_per_feed // 10
+    return [
+        generate_rss_feed(
+            root / f"feed_{i}.xml",
+            n_papers=min(n_per_feed, n_papers - i * n_per_feed) + (n_cross_listed if i > 0 else 0),
+            seed=seed + i,
+            first_id=i * n_per_feed - (n_cross_listed if i > 0 else 0),
+        )
+        for i in range(n_feeds)
+    ]
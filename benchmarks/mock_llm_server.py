@@ -0,0 +1,286 @@
+"""Local stub of an OpenAI-compatible LLM server for benchmarks.
+
+It serves /v1/chat/completions (plain and streamed), /v1/embeddings, the
+llama.cpp /tokenize endpoint and /health with deterministic answers and
+simulates the costs of a real server:
+
+* latency_s: time before the first token (prefill and scheduling);
+* tokens_per_second: decoding speed, i.e. the time between streamed tokens;
+* max_concurrent_requests: number of requests processed at once (slots),
+  the others wait in the queue as they would with a busy llama.cpp server;
+* error_rate: share of requests failed with 503 before being processed.
+
+Classification prompts are answered with 'yes'/'no', or with a JSON array of
+them when the prompt asks for one, so the classification code paths run as
+with a real model. Token logprobs are reported when requested, with a random
+(but deterministic) confidence of every yes/no verdict. Embeddings are hashed bags of words so that the embedding
+ranker retrieves sections sharing words with the query.
+
+Usage as a standalone server:
+    python -m benchmarks.mock_llm_server --port 9191 --latency-ms 100 --tokens-per-second 50
+"""
+import argparse
+from hashlib import blake2b
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Optional
+
+
+_JSON_ARRAY_PATTERN = re.compile(r"JSON array of (\d+)")
+_YES_NO_PATTERN = re.compile(r"'?yes'?( or |/)'?no'?", re.IGNORECASE)
+_WORD_PATTERN = re.compile(r"\w+")
+_VERDICT_TOKEN_PATTERN = re.compile(r"yes|no|[^a-z]+")
+_FILLER_WORDS = ("the", "plan", "for", "today", "is", "to", "review", "notes", "and", "rest")
+
+
+class MockLlmServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_s: float = 0.05,
+        tokens_per_second: Optional[float] = 200.0,
+        max_concurrent_requests: int = 4,
+        error_rate: float = 0.0,
+        relevance_rate: float = 0.2,
+        completion_tokens: int = 64,
+        embedding_dim: int = 256,
+        seed: int = 0,
+    ) -> None:
+        self.latency_s = latency_s
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.relevance_rate = relevance_rate
+        self.completion_tokens = completion_tokens
+        self.embedding_dim = embedding_dim
+        self.slots = threading.BoundedSemaphore(max_concurrent_requests)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._records: list[dict[str, Any]] = []
+        self._records_lock = threading.Lock()
+        super().__init__((host, port), MockLlmRequestHandler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def records(self) -> list[dict[str, Any]]:
+        """Return one record per request: endpoint, status, latency (queueing included) and tokens."""
+        with self._records_lock:
+            return list(self._records)
+
+    def reset_records(self) -> None:
+        with self._records_lock:
+            self._records.clear()
+
+    def record(self, **record: Any) -> None:
+        with self._records_lock:
+            self._records.append(record)
+
+    def should_fail(self) -> bool:
+        with self._rng_lock:
+            return self._rng.random() < self.error_rate
+
+    def chat_answer(self, messages: list[dict[str, str]]) -> list[str]:
+        """Return the answer as a list of tokens (words with their leading spaces)."""
+        user_prompt = messages[-1]["content"]
+        m = _JSON_ARRAY_PATTERN.search(user_prompt)
+        if m is not None:
+            answer = json.dumps([self._verdict(user_prompt, i) for i in range(int(m.group(1)))])
+            return _VERDICT_TOKEN_PATTERN.findall(answer)  # verdicts are separate tokens as with real tokenizers
+
+        if any(_YES_NO_PATTERN.search(m["content"]) for m in messages):
+            return [self._verdict(user_prompt, 0)]
+
+        words = [_FILLER_WORDS[i % len(_FILLER_WORDS)] for i in range(self.completion_tokens)]
+        return [words[0]] + [" " + w for w in words[1:]]
+
+    def token_logprobs(self, text: str, tokens: list[str], top_logprobs: int) -> list[dict[str, Any]]:
+        """Return the logprobs of the tokens answering text as in choices[0].logprobs.content of the OpenAI API."""
+        content = []
+        for i, token in enumerate(tokens):
+            alternatives = [(token, 0.0)]
+            if token in ("yes", "no"):
+                h = int.from_bytes(blake2b(f"{i}\0{text}".encode(), digest_size=8).digest(), "little")
+                p = 0.5 + 0.5 * h / 2**64
+                alternatives = [(token, math.log(p)), ("no" if token == "yes" else "yes", math.log(1.0 - p))]
+            content.append({
+                "token": token,
+                "logprob": alternatives[0][1],
+                "top_logprobs": [{"token": t, "logprob": lp} for t, lp in alternatives[:top_logprobs]],
+            })
+        return content
+
+    def embedding(self, text: str) -> list[float]:
+        vector = [0.0] * self.embedding_dim
+        for word in _WORD_PATTERN.findall(text.lower()):
+            h = int.from_bytes(blake2b(word.encode(), digest_size=8).digest(), "little")
+            vector[h % self.embedding_dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def _verdict(self, text: str, i: int) -> str:
+        # Deterministic per prompt and item, so that repeated runs issue the same requests
+        h = int.from_bytes(blake2b(f"{i}\0{text}".encode(), digest_size=8).digest(), "little")
+        return "yes" if h / 2**64 < self.relevance_rate else "no"
+
+
+class MockLlmRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockLlmServer
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, {"status": "ok"})
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self) -> None:
+        arrival_time = time.perf_counter()
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if self.path.endswith("/chat/completions"):
+            endpoint = "chat"
+        elif self.path.endswith("/embeddings"):
+            endpoint = "embeddings"
+        elif self.path == "/tokenize":
+            # Not an LLM call, neither slowed down nor recorded
+            self._send_json(HTTPStatus.OK, {"tokens": list(range(_estimate_n_tokens(body["content"])))})
+            return
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint {self.path}"})
+            return
+
+        if self.server.should_fail():
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Injected failure"})
+            self.server.record(
+                endpoint=endpoint, status=503, latency_s=time.perf_counter() - arrival_time,
+                prompt_tokens=0, completion_tokens=0,
+            )
+            return
+
+        with self.server.slots:
+            if endpoint == "chat":
+                prompt_tokens, completion_tokens = self._chat(body)
+            else:
+                prompt_tokens, completion_tokens = self._embeddings(body), 0
+
+        self.server.record(
+            endpoint=endpoint, status=200, latency_s=time.perf_counter() - arrival_time,
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        )
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _chat(self, body: dict[str, Any]) -> tuple[int, int]:
+        messages = body["messages"]
+        prompt_tokens = sum(_estimate_n_tokens(m["content"]) for m in messages)
+        tokens = self.server.chat_answer(messages)
+        if body.get("max_tokens"):
+            tokens = tokens[:body["max_tokens"]]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        time.sleep(self.server.latency_s)
+        token_time = 1.0 / self.server.tokens_per_second if self.server.tokens_per_second else 0.0
+
+        if not body.get("stream"):
+            time.sleep(token_time * len(tokens))
+            choice = {"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}
+            if body.get("logprobs"):
+                choice["logprobs"] = {"content": self.server.token_logprobs(
+                    messages[-1]["content"], tokens, body.get("top_logprobs") or 1
+                )}
+            self._send_json(HTTPStatus.OK, {"object": "chat.completion", "choices": [choice], "usage": usage})
+            return prompt_tokens, len(tokens)
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(token_time)
+            self._send_event({"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": token}}]})
+        self._send_event({"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if body.get("stream_options", {}).get("include_usage"):
+            self._send_event({"object": "chat.completion.chunk", "choices": [], "usage": usage})
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+        return prompt_tokens, len(tokens)
+
+    def _embeddings(self, body: dict[str, Any]) -> int:
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        prompt_tokens = sum(_estimate_n_tokens(text) for text in texts)
+        time.sleep(self.server.latency_s)
+        self._send_json(HTTPStatus.OK, {
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": self.server.embedding(text)} for i, text in enumerate(texts)],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        })
+        return prompt_tokens
+
+    def _send_json(self, status: HTTPStatus, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, event: dict[str, Any]) -> None:
+        self._send_chunk(b"data: " + json.dumps(event).encode() + b"\n\n")
+
+    def _send_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def _estimate_n_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9191)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--max-concurrent-requests", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockLlmServer(
+        host=args.host,
+        port=args.port,
+        latency_s=args.latency_ms / 1000,
+        tokens_per_second=args.tokens_per_second,
+        max_concurrent_requests=args.max_concurrent_requests,
+        error_rate=args.error_rate,
+    )
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import json
+import logging
+import math
+import re
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from omegaconf import DictConfig
+
+from llmass.client import LlmClient
+from llmass.interaction import compose_messages
+from llmass.utils.concurrency import map_concurrently
+
+
+LOGGER = logging.getLogger(__name__)
+VERDICT_PATTERN = re.compile(r"\b(yes|no|true|false)\b", re.IGNORECASE)
+BATCH_MAX_TOKENS_PER_ITEM = 6  # '"yes", ' takes 3-4 tokens with the common tokenizers
+JSON_OBJECT_MAX_TOKENS = 8  # '{"verdicts": ' and '}' around the answer with the json_schema constraint
+
+
+def classify_items(
+    llm_client: LlmClient,
+    prompts: DictConfig,
+    question: str,
+    items: Sequence[str],
+    batching: DictConfig,
+    max_workers: int,
+    description: Optional[str] = None,
+    decoding: Optional[DictConfig] = None,
+) -> list[float]:
+    """Ask the LLM a yes/no question about every item and return the probability of yes for each.
+
+    If batching is enabled, several items are packed into a single prompt
+    (see batch_user_prompt_prefix and batch_user_prompt_suffix in prompts)
+    and the LLM is asked for a JSON array of verdicts. Batches whose output
+    cannot be parsed are re-classified item by item. A progress bar is shown
+    if description is given.
+
+    decoding (the classification section of the config) constrains the
+    answers to yes/no and asks for the token logprobs. Without logprobs the
+    probabilities are 1.0 or 0.0, answers with neither yes nor no count as no.
+    """
+    if not batching.enabled:
+        return map_concurrently(
+            lambda item: _classify_single_item(llm_client, prompts, question, item, decoding),
+            items,
+            max_workers=max_workers,
+            description=description,
+        )
+
+    batches = split_into_batches(
+        items,
+        token_budget=batch_token_budget(prompts, question, batching),
+        max_batch_size=batching.max_batch_size,
+    )
+    batch_verdicts = map_concurrently(
+        lambda batch: classify_batch(llm_client, prompts, question, [items[i] for i in batch], decoding),
+        batches,
+        max_workers=max_workers,
+        description=description,
+    )
+    probabilities = [0.0] * len(items)
+    for batch, batch_probabilities in zip(batches, batch_verdicts):
+        for i, probability in zip(batch, batch_probabilities):
+            probabilities[i] = probability
+
+    return probabilities
+
+
+def classify_batch(
+    llm_client: LlmClient,
+    prompts: DictConfig,
+    question: str,
+    batch_items: Sequence[str],
+    decoding: Optional[DictConfig] = None,
+) -> list[float]:
+    """Classify items with a single request, or one request per item if the output is malformed."""
+    probabilities = None
+    if len(batch_items) > 1:
+        probabilities = _classify_batch(llm_client, prompts, question, batch_items, decoding)
+    if probabilities is None:
+        probabilities = [
+            _classify_single_item(llm_client, prompts, question, item, decoding) for item in batch_items
+        ]
+
+    return probabilities
+
+
+def batch_token_budget(prompts: DictConfig, question: str, batching: DictConfig) -> int:
+    """Return the number of tokens available for the items of a batch."""
+    overhead = estimate_n_tokens(
+        " ".join([prompts.system_prompt, prompts.batch_user_prompt_prefix, question, prompts.batch_user_prompt_suffix])
+    )
+    return batching.context_token_budget - overhead
+
+
+def split_into_batches(
+    items: Sequence[str],
+    token_budget: int,
+    max_batch_size: int,
+) -> list[list[int]]:
+    """Greedily group consecutive item indices so that each group fits the token budget.
+
+    An item exceeding the budget on its own forms a single-item batch.
+    """
+    batches = []
+    batch = []
+    batch_n_tokens = 0
+    for i, item in enumerate(items):
+        n_tokens = estimate_batch_item_n_tokens(len(batch), item)
+        if batch and (batch_n_tokens + n_tokens > token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch = []
+            batch_n_tokens = 0
+        batch.append(i)
+        batch_n_tokens += n_tokens
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def parse_verdicts(llm_output: str, n_items: int) -> Optional[list[bool]]:
+    """Parse a JSON array of yes/no verdicts, return None if the output is malformed.
+
+    The array may also come as the verdicts field of an object, which is what
+    the json_schema constraint asks for (see classification_params).
+    """
+    try:
+        raw_verdicts = json.loads(llm_output)
+    except json.JSONDecodeError:
+        raw_verdicts = None
+    if isinstance(raw_verdicts, dict):
+        raw_verdicts = raw_verdicts.get("verdicts")
+    elif not isinstance(raw_verdicts, list):
+        start = llm_output.find("[")
+        end = llm_output.rfind("]")
+        if start == -1 or end < start:
+            return None
+
+        try:
+            raw_verdicts = json.loads(llm_output[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+
+    if not isinstance(raw_verdicts, list) or len(raw_verdicts) != n_items:
+        return None
+
+    verdicts = []
+    for v in raw_verdicts:
+        if isinstance(v, bool):
+            verdicts.append(v)
+        elif isinstance(v, str) and parse_verdict(v) is not None:
+            verdicts.append(parse_verdict(v))
+        else:
+            return None
+
+    return verdicts
+
+
+def parse_verdict(llm_output: str) -> Optional[bool]:
+    """Return the first yes/no (or true/false) word of the output, None if there is none."""
+    m = VERDICT_PATTERN.search(llm_output)
+    if m is None:
+        return None
+
+    return m.group(1).lower() in ("yes", "true")
+
+
+def verdict_probabilities(logprobs: list[dict[str, Any]]) -> list[float]:
+    """Return the probability of yes at every yes/no token of the completion.
+
+    It is computed over the top logprobs of the token, i.e. over all the ways
+    to spell yes and no the server considered there (" Yes", "yes", "true"),
+    or from the logprob of the sampled token alone if there are no top ones.
+    """
+    probabilities = []
+    for token in logprobs:
+        verdict = _token_verdict(token["token"])
+        if verdict is None:
+            continue
+
+        if not token.get("top_logprobs"):
+            p = math.exp(token["logprob"])
+            probabilities.append(p if verdict else 1.0 - p)
+            continue
+
+        p_yes, p_no = 0.0, 0.0
+        for alternative in token["top_logprobs"]:
+            alternative_verdict = _token_verdict(alternative["token"])
+            if alternative_verdict is True:
+                p_yes += math.exp(alternative["logprob"])
+            elif alternative_verdict is False:
+                p_no += math.exp(alternative["logprob"])
+        probabilities.append(p_yes / (p_yes + p_no) if p_yes + p_no > 0.0 else float(verdict))
+
+    return probabilities
+
+
+def classification_params(decoding: Optional[DictConfig], n_items: Optional[int] = None) -> dict[str, Any]:
+    """Return the request params restricting the answer to yes or no, or to a JSON array of n_items of them."""
+    if decoding is None:
+        return {}
+
+    choices = ["yes", "no"]
+    if n_items is None:
+        schema: dict[str, Any] = {"type": "string", "enum": choices}
+        grammar = 'root ::= "yes" | "no"'
+        params = {"max_tokens": decoding.max_tokens} if decoding.max_tokens is not None else {}
+    else:
+        if decoding.constraint is None:
+            return {}  # an unconstrained JSON array may come with any formatting
+        schema = {"type": "array", "items": {"type": "string", "enum": choices}, "minItems": n_items, "maxItems": n_items}
+        grammar = (
+            'root ::= "[" verdict' + ' ", " verdict' * (n_items - 1) + ' "]"\n'
+            'verdict ::= "\\"yes\\"" | "\\"no\\""'
+        )
+        params = {"max_tokens": BATCH_MAX_TOKENS_PER_ITEM * n_items + 2}
+
+    if decoding.constraint == "grammar":  # llama.cpp GBNF
+        params["grammar"] = grammar
+    elif decoding.constraint == "guided":  # vLLM guided decoding
+        if n_items is None:
+            params["guided_choice"] = choices
+        else:
+            params["guided_json"] = schema
+    elif decoding.constraint == "json_schema":  # OpenAI structured outputs
+        # The root of a strict schema must be an object, the answer is {"verdict": "yes"} or {"verdicts": [...]}
+        field_name = "verdict" if n_items is None else "verdicts"
+        if "max_tokens" in params:
+            params["max_tokens"] += JSON_OBJECT_MAX_TOKENS
+        params["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "verdicts",
+                "schema": {
+                    "type": "object",
+                    "properties": {field_name: schema},
+                    "required": [field_name],
+                    "additionalProperties": False,
+                },
+                "strict": True,
+            },
+        }
+    elif decoding.constraint is not None:
+        raise ValueError(f"Unknown classification constraint: {decoding.constraint}")
+
+    return params
+
+
+def estimate_n_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    return int(len(text) / chars_per_token) + 1
+
+
+def estimate_batch_item_n_tokens(i: int, item: str) -> int:
+    return estimate_n_tokens(_format_batch_item(i, item))
+
+
+def _classify_batch(
+    llm_client: LlmClient,
+    prompts: DictConfig,
+    question: str,
+    batch_items: Sequence[str],
+    decoding: Optional[DictConfig],
+) -> Optional[list[float]]:
+    messages = compose_messages(
+        system_prompt=prompts.system_prompt,
+        user_prompt_prefix=prompts.batch_user_prompt_prefix,
+        user_prompt_question=question,
+        user_prompt_suffix=prompts.batch_user_prompt_suffix.format(n_items=len(batch_items)),
+        user_prompt_extra_content="\n\n".join(
+            _format_batch_item(i, item) for i, item in enumerate(batch_items)
+        ),
+    )
+    llm_output, logprobs = _ask(llm_client, messages, decoding, n_items=len(batch_items))
+    verdicts = parse_verdicts(llm_output, len(batch_items))
+    if verdicts is None:
+        LOGGER.warning(
+            f"Malformed verdicts for a batch of {len(batch_items)} items, falling back to per-item calls"
+        )
+        return None
+
+    probabilities = verdict_probabilities(logprobs)
+    if len(probabilities) != len(verdicts):  # no logprobs or yes/no tokens elsewhere in the output
+        return [float(verdict) for verdict in verdicts]
+    return probabilities
+
+
+def _classify_single_item(
+    llm_client: LlmClient,
+    prompts: DictConfig,
+    question: str,
+    item: str,
+    decoding: Optional[DictConfig],
+) -> float:
+    messages = compose_messages(
+        system_prompt=prompts.system_prompt,
+        user_prompt_prefix=prompts.user_prompt_prefix,
+        user_prompt_question=question,
+        user_prompt_suffix=prompts.user_prompt_suffix,
+        user_prompt_extra_content=item,
+    )
+    llm_output, logprobs = _ask(llm_client, messages, decoding)
+    verdict = parse_verdict(llm_output)
+    if verdict is None:
+        LOGGER.warning(f"Neither yes nor no in the LLM output, counting it as no: '{llm_output[:200]}'")
+        return 0.0
+
+    probabilities = verdict_probabilities(logprobs)
+    return probabilities[0] if probabilities else float(verdict)
+
+
+def _ask(
+    llm_client: LlmClient,
+    messages: list[dict[str, str]],
+    decoding: Optional[DictConfig],
+    n_items: Optional[int] = None,
+) -> tuple[str, list[dict[str, Any]]]:
+    params = classification_params(decoding, n_items)
+    if decoding is not None and decoding.logprobs:
+        return llm_client.chat_with_logprobs(
+            messages, role="classification", top_logprobs=decoding.top_logprobs, **params
+        )
+    return llm_client.chat(messages, role="classification", **params), []
+
+
+def _token_verdict(token: str) -> Optional[bool]:
+    word = re.sub(r"[^a-z]", "", token.lower())
+    if word in ("yes", "true"):
+        return True
+    if word in ("no", "false"):
+        return False
+    return None
+
+
+def _format_batch_item(i: int, item: str) -> str:
+    return f"Item {i + 1}:\n{item}"
@@ -0,0 +1,501 @@
+import json
+import logging
+import socket
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+import requests
+from omegaconf import DictConfig
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
+
+from llmass.cache import ResponseCache, response_cache_from_config
+from llmass.routing import Backend, BackendPool, backend_pool_from_config, is_backend_failure, parse_backends
+from llmass.telemetry import LlmCallRecord, Telemetry, get_telemetry
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class PromptUsage:
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0  # tokens whose KV cache was reused by the server, i.e. no prefill was needed
+
+    def __iadd__(self, other: "PromptUsage") -> "PromptUsage":
+        self.prompt_tokens += other.prompt_tokens
+        self.cached_prompt_tokens += other.cached_prompt_tokens
+        return self
+
+    @classmethod
+    def from_response(cls, response_json: dict[str, Any]) -> "PromptUsage":
+        # llama.cpp reports the number of reused and processed tokens in timings
+        timings = response_json.get("timings") or {}
+        if "prompt_n" in timings:
+            cached = timings.get("cache_n", 0)
+            return cls(prompt_tokens=timings["prompt_n"] + cached, cached_prompt_tokens=cached)
+
+        # OpenAI-compatible servers (e.g., vLLM) report them in usage
+        usage = response_json.get("usage") or {}
+        details = usage.get("prompt_tokens_details") or {}
+        return cls(
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            cached_prompt_tokens=details.get("cached_tokens") or 0,
+        )
+
+
+class LlmClient:
+    """Client of an OpenAI-compatible LLM server.
+
+    It owns a pool of keep-alive connections shared by all the modes and
+    retries failed requests (connection errors and 5xx responses) with
+    exponential backoff. Chat requests are balanced across the backends of
+    chat_url (see llmass.routing) and a request failing on one backend is
+    sent to another one if there is any.
+    """
+    retry_status_codes = (500, 502, 503, 504)
+
+    def __init__(
+        self,
+        chat_url: Union[str, BackendPool],
+        embeddings_url: Optional[str] = None,
+        tokenize_url: Optional[str] = None,
+        connect_timeout: float = 5.0,
+        read_timeout: Optional[float] = None,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_maxsize: int = 16,
+        unix_socket: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        prompt_cache_params: Optional[dict[str, Any]] = None,
+        telemetry: Optional[Telemetry] = None,
+    ) -> None:
+        self.backends = BackendPool(parse_backends(chat_url)) if isinstance(chat_url, str) else chat_url
+        self.embeddings_url = embeddings_url
+        self.tokenize_url = tokenize_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache
+        # Server-specific hints (e.g., llama.cpp cache_prompt and id_slot) sent with every chat request.
+        # They do not affect the output and are thus not a part of the response cache key
+        self.prompt_cache_params = prompt_cache_params or {}
+        self.prompt_usage = PromptUsage()
+        self._prompt_usage_lock = threading.Lock()
+        self.telemetry = telemetry
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.retry_status_codes,
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        if unix_socket is not None:
+            adapter = UnixSocketAdapter(unix_socket, pool_maxsize=pool_maxsize, max_retries=retry)
+        else:
+            adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.session.mount("http://", adapter)
+        if unix_socket is None:
+            self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_config(cls, cfg: DictConfig) -> "LlmClient":
+        return cls(
+            chat_url=backend_pool_from_config(
+                cfg.llm_server_url, cfg.llm_client.routing, timeout=cfg.llm_client.connect_timeout
+            ),
+            embeddings_url=cfg.llm_embeddings_url,
+            tokenize_url=cfg.llm_tokenize_url,
+            connect_timeout=cfg.llm_client.connect_timeout,
+            read_timeout=cfg.llm_client.read_timeout,
+            max_retries=cfg.llm_client.max_retries,
+            backoff_factor=cfg.llm_client.backoff_factor,
+            pool_maxsize=cfg.llm_client.pool_maxsize,
+            unix_socket=cfg.llm_client.unix_socket,
+            cache=response_cache_from_config(cfg.response_cache),
+            prompt_cache_params=_prompt_cache_params_from_config(cfg.prompt_cache),
+            telemetry=get_telemetry(cfg),
+        )
+
+    def chat(
+        self,
+        messages: list[dict[str, str]],
+        use_cache: Optional[bool] = None,
+        role: str = "interactive",
+        **params: Any,
+    ) -> str:
+        return self._chat(messages, use_cache, role, params)[0]
+
+    def chat_with_logprobs(
+        self,
+        messages: list[dict[str, str]],
+        use_cache: Optional[bool] = None,
+        role: str = "interactive",
+        top_logprobs: int = 5,
+        **params: Any,
+    ) -> tuple[str, list[dict[str, Any]]]:
+        """Return the completion and its tokens with their logprobs and top_logprobs most likely alternatives.
+
+        The tokens are as in choices[0].logprobs.content of the OpenAI API, an
+        empty list if the server does not report logprobs.
+        """
+        return self._chat(messages, use_cache, role, {"logprobs": True, "top_logprobs": top_logprobs, **params})
+
+    def _chat(
+        self,
+        messages: list[dict[str, str]],
+        use_cache: Optional[bool],
+        role: str,
+        params: dict[str, Any],
+    ) -> tuple[str, list[dict[str, Any]]]:
+        start_time = time.perf_counter()
+        cache = self.cache if _uses_cache(use_cache, role) else None
+        with_logprobs = bool(params.get("logprobs"))
+        if cache is not None:
+            cache_key = ResponseCache.make_key(self.backends.cache_namespace(role), messages, params)
+            cached_output = cache.get(cache_key)
+            if cached_output is not None:
+                self._record_call("chat", _n_message_chars(messages), start_time, cache_hit=True)
+                if with_logprobs:
+                    llm_output, logprobs = json.loads(cached_output)
+                    return llm_output, logprobs
+                return cached_output, []
+
+        response_json = self._post_chat(
+            {"messages": messages, **self.prompt_cache_params, **params}, _n_message_chars(messages), role
+        )
+        self._record_prompt_usage(PromptUsage.from_response(response_json))
+        assert len(response_json["choices"]) == 1, "Only single message in choices is supported"
+
+        choice = response_json["choices"][0]
+        llm_output = choice["message"]["content"]
+        logprobs = ((choice.get("logprobs") or {}).get("content") or []) if with_logprobs else []
+        if cache is not None:
+            cache.set(cache_key, json.dumps([llm_output, logprobs], ensure_ascii=False) if with_logprobs else llm_output)
+
+        return llm_output, logprobs
+
+    def stream_chat(
+        self,
+        messages: list[dict[str, str]],
+        use_cache: Optional[bool] = None,
+        role: str = "interactive",
+        **params: Any,
+    ) -> "ChatStream":
+        """Return the completion as an iterator over text chunks arriving from the server."""
+        return ChatStream(self, messages, use_cache, role, params)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if self.embeddings_url is None:
+            raise ValueError("LLM embeddings URL is not set")
+
+        response_json = self._post(
+            "embeddings", self.embeddings_url, {"input": texts}, sum(len(text) for text in texts)
+        )
+        data = sorted(response_json["data"], key=lambda d: d["index"])
+        assert len(data) == len(texts), "Number of embeddings must match the number of input texts"
+
+        return [d["embedding"] for d in data]
+
+    def tokenize(self, text: str) -> list[int]:
+        """Return the tokens of text according to the tokenizer of the model (llama.cpp /tokenize endpoint)."""
+        if self.tokenize_url is None:
+            raise ValueError("LLM tokenize URL is not set")
+
+        r = self.session.post(self.tokenize_url, data=json.dumps({"content": text}), timeout=self.timeout)
+        r.raise_for_status()
+        return json.loads(r.content)["tokens"]
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _record_prompt_usage(self, prompt_usage: PromptUsage) -> None:
+        with self._prompt_usage_lock:
+            self.prompt_usage += prompt_usage
+
+    def _record_call(
+        self,
+        kind: str,
+        prompt_chars: int,
+        start_time: float,
+        response_json: Optional[dict[str, Any]] = None,
+        **fields: Any,
+    ) -> None:
+        if self.telemetry is None:
+            return
+
+        record = LlmCallRecord(
+            kind=kind, prompt_chars=prompt_chars, total_time_s=time.perf_counter() - start_time, **fields
+        )
+        if response_json is not None:
+            record.update_from_response(response_json)
+            prompt_usage = PromptUsage.from_response(response_json)
+            record.prompt_tokens = prompt_usage.prompt_tokens
+            record.cached_prompt_tokens = prompt_usage.cached_prompt_tokens
+        self.telemetry.record(record)
+
+    def _send_chat(self, payload: dict[str, Any], role: str, stream: bool = False) -> tuple[Backend, requests.Response]:
+        """Send the chat request to a backend, to the next one if it fails, and return the successful response.
+
+        The backend stays acquired and must be released once the response is consumed.
+        """
+        tried = set()
+        while True:
+            backend = self.backends.acquire(role, exclude=tried)
+            r = None
+            try:
+                r = self.session.post(backend.url, data=json.dumps(payload), timeout=self.timeout, stream=stream)
+                r.raise_for_status()
+                return backend, r
+            except Exception as e:
+                if r is not None:
+                    r.close()
+                self.backends.release(backend, e)
+                tried.add(backend.url)
+                if not is_backend_failure(e) or not self.backends.has_alternative(role, exclude=tried):
+                    raise
+                LOGGER.warning(f"LLM backend {backend.url} failed, sending the request to another one: {e!r}")
+
+    def _post_chat(self, payload: dict[str, Any], prompt_chars: int, role: str) -> dict[str, Any]:
+        start_time = time.perf_counter()
+        backend, r = None, None
+        try:
+            backend, r = self._send_chat(payload, role)
+            response_json = json.loads(r.content)
+        except Exception as e:
+            self._record_call(
+                "chat", prompt_chars, start_time, retries=_n_retries(r or getattr(e, "response", None)), error=repr(e),
+                backend=backend.url if backend is not None else None,
+            )
+            raise
+        finally:
+            if backend is not None:
+                self.backends.release(backend)
+
+        self._record_call("chat", prompt_chars, start_time, response_json, retries=_n_retries(r), backend=backend.url)
+        return response_json
+
+    def _post(self, kind: str, url: str, payload: dict[str, Any], prompt_chars: int) -> dict[str, Any]:
+        start_time = time.perf_counter()
+        r = None
+        try:
+            r = self.session.post(url, data=json.dumps(payload), timeout=self.timeout)
+            r.raise_for_status()
+            # Decode bytes directly to avoid charset detection on large responses
+            response_json = json.loads(r.content)
+        except Exception as e:
+            self._record_call(kind, prompt_chars, start_time, retries=_n_retries(r), error=repr(e))
+            raise
+
+        self._record_call(kind, prompt_chars, start_time, response_json, retries=_n_retries(r))
+        return response_json
+
+
+class ChatStream:
+    """Iterator over the chunks of a streamed (server-sent events) chat completion.
+
+    Time to first token and decoding speed are available once the iteration is over.
+    """
+    def __init__(
+        self,
+        llm_client: LlmClient,
+        messages: list[dict[str, str]],
+        use_cache: Optional[bool],
+        role: str,
+        params: dict[str, Any],
+    ) -> None:
+        self.llm_client = llm_client
+        self.messages = messages
+        self.cache = llm_client.cache if _uses_cache(use_cache, role) else None
+        self.role = role
+        self.params = params
+        self.time_to_first_token: Optional[float] = None
+        self.total_time: Optional[float] = None
+        self.n_tokens = 0
+        self.prompt_usage = PromptUsage()
+        self.from_cache = False
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if self.total_time is None or self.time_to_first_token is None:
+            return None
+        decoding_time = self.total_time - self.time_to_first_token
+        return self.n_tokens / decoding_time if decoding_time > 0 else None
+
+    def __iter__(self) -> Iterator[str]:
+        start_time = time.perf_counter()
+        prompt_chars = _n_message_chars(self.messages)
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key(self.llm_client.backends.cache_namespace(self.role), self.messages, self.params)
+            cached_output = self.cache.get(cache_key)
+            if cached_output is not None:
+                self.from_cache = True
+                self.llm_client._record_call("stream", prompt_chars, start_time, cache_hit=True)
+                yield cached_output
+                return
+
+        chunks = []
+        usage_event: dict[str, Any] = {}  # the last event with usage or timings
+        backend, r = None, None
+        error = None
+        try:
+            backend, r = self.llm_client._send_chat(
+                {
+                    "messages": self.messages,
+                    "stream": True,
+                    "stream_options": {"include_usage": True},
+                    **self.llm_client.prompt_cache_params,
+                    **self.params,
+                },
+                self.role,
+                stream=True,
+            )
+            with r:
+                # chunk_size=None hands over every chunk as soon as it arrives
+                for line in r.iter_lines(chunk_size=None):
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[len(b"data:"):].strip()
+                    if data == b"[DONE]":
+                        break
+
+                    event = json.loads(data)
+                    if event.get("usage") or event.get("timings"):
+                        usage_event = event
+                        self.prompt_usage = PromptUsage.from_response(event)
+                    if not event.get("choices"):
+                        continue
+
+                    chunk = event["choices"][0].get("delta", {}).get("content")
+                    if chunk:
+                        if self.time_to_first_token is None:
+                            self.time_to_first_token = time.perf_counter() - start_time
+                        self.n_tokens += 1
+                        chunks.append(chunk)
+                        yield chunk
+        except Exception as e:
+            error = e
+            self.llm_client._record_call(
+                "stream", prompt_chars, start_time, retries=_n_retries(r or getattr(e, "response", None)),
+                error=repr(e), time_to_first_token_s=self.time_to_first_token,
+                backend=backend.url if backend is not None else None,
+            )
+            raise
+        finally:
+            # Also when the consumer stops iterating early
+            if backend is not None:
+                self.llm_client.backends.release(backend, error)
+
+        self.total_time = time.perf_counter() - start_time
+        self.llm_client._record_prompt_usage(self.prompt_usage)
+        self.llm_client._record_call(
+            "stream", prompt_chars, start_time, usage_event, retries=_n_retries(r),
+            time_to_first_token_s=self.time_to_first_token, backend=backend.url,
+        )
+        usage = usage_event.get("usage") or {}
+        if usage.get("completion_tokens"):
+            self.n_tokens = usage["completion_tokens"]
+        if self.time_to_first_token is not None:
+            LOGGER.info(
+                f"Streamed {self.n_tokens} tokens: time to first token {self.time_to_first_token:.2f} s, "
+                f"{self.tokens_per_second or 0.0:.1f} tokens/s"
+            )
+        if self.cache is not None:
+            self.cache.set(cache_key, "".join(chunks))
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """Transport adapter sending all the HTTP requests to a Unix domain socket."""
+    def __init__(self, socket_path: str, **kwargs: Any) -> None:
+        self.socket_path = socket_path
+        self._pool_lock = threading.Lock()
+        self._pool: Optional[HTTPConnectionPool] = None
+        super().__init__(**kwargs)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self._get_pool()
+
+    def get_connection(self, url, proxies=None):
+        return self._get_pool()
+
+    def close(self) -> None:
+        super().close()
+        if self._pool is not None:
+            self._pool.close()
+
+    def _get_pool(self) -> HTTPConnectionPool:
+        with self._pool_lock:
+            if self._pool is None:
+                connection_cls = type(
+                    "_BoundUnixSocketConnection",
+                    (_UnixSocketConnection,),
+                    {"socket_path": self.socket_path},
+                )
+                self._pool = HTTPConnectionPool(
+                    "localhost",
+                    maxsize=self._pool_maxsize,
+                    block=self._pool_block,
+                )
+                self._pool.ConnectionCls = connection_cls
+            return self._pool
+
+
+class _UnixSocketConnection(HTTPConnection):
+    socket_path: str
+
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise NewConnectionError(self, f"Failed to connect to {self.socket_path}: {e}") from e
+        return sock
+
+
+def _prompt_cache_params_from_config(cfg: DictConfig) -> dict[str, Any]:
+    params = {}
+    if cfg.cache_prompt is not None:
+        params["cache_prompt"] = cfg.cache_prompt
+    if cfg.slot_id is not None:
+        params["id_slot"] = cfg.slot_id
+    return params
+
+
+def _uses_cache(use_cache: Optional[bool], role: str) -> bool:
+    # Classification and summaries are functions of the prompt, while a question typed again in a
+    # mode is usually asked for another answer. Callers opt in for the fixed ones (the startup question)
+    return use_cache if use_cache is not None else role != "interactive"
+
+
+def _n_message_chars(messages: list[dict[str, str]]) -> int:
+    return sum(len(message["content"]) for message in messages)
+
+
+def _n_retries(r: Optional[requests.Response]) -> int:
+    """Return the number of retries urllib3 made before getting the response."""
+    retries = getattr(r.raw, "retries", None) if r is not None else None
+    return len(retries.history) if retries is not None else 0
+
+
+_llm_client: Optional[LlmClient] = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client(cfg: DictConfig) -> LlmClient:
+    """Return the LLM client shared by the entire application."""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = LlmClient.from_config(cfg)
+        return _llm_client
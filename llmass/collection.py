@@ -0,0 +1,328 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from array import array
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Optional
+
+from omegaconf import DictConfig
+
+from llmass.utils.markdown import iter_section_spans
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class CollectionChanges:
+    added: list[str] = field(default_factory=list)
+    modified: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.deleted)
+
+
+class CollectionSections:
+    """Compact table of the sections of a collection.
+
+    Sections are stored as (file_id, start, end) byte spans of their content
+    in compact arrays. The content is read from the file and decoded only
+    when a section is accessed, i.e., when it is about to be sent to the LLM
+    or displayed; bulk consumers (indexes, summaries) read the sections file by
+    file with iter_contents or iter_texts instead. If the file has changed since it was scanned (its mtime or
+    size differ), the section is looked up in its current content instead.
+    """
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.files: list[str] = []
+        self.file_stats: list[tuple[int, int]] = []  # mtime_ns and size of the files when they were scanned
+        self.file_ids = array("I")
+        self.starts = array("Q")
+        self.ends = array("Q")
+        self.headers: list[str] = []
+        self.hashes: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __getitem__(self, i: int) -> dict[str, str]:
+        return {
+            "file": self.file(i),
+            "header": self.headers[i],
+            "content": self.content(i),
+            "sha256": self.hashes[i],
+        }
+
+    def file(self, i: int) -> str:
+        return self.files[self.file_ids[i]]
+
+    def content(self, i: int) -> str:
+        start, end = self.starts[i], self.ends[i]
+        if start == end:
+            return ""
+
+        try:
+            with open(self.root / self.file(i), "rb") as f:
+                st = os.fstat(f.fileno())
+                if (st.st_mtime_ns, st.st_size) == self.file_stats[self.file_ids[i]]:
+                    f.seek(start)
+                    raw_content = f.read(end - start)
+                else:
+                    raw_content = self._rescan_content(i, f.read())
+        except FileNotFoundError:
+            LOGGER.warning(f"{self.file(i)} was deleted since the collection was refreshed")
+            return ""
+        return _decode_content(raw_content)
+
+    def iter_contents(self, ids: Optional[Iterable[int]] = None) -> Iterator[tuple[int, str]]:
+        """Yield the ids and contents of the sections (all of them by default) file by file.
+
+        Every file is opened and read once however many of its sections are
+        requested, the sections are yielded in the order of their files.
+        """
+        ids = range(len(self)) if ids is None else sorted(ids, key=lambda i: (self.file_ids[i], i))
+        for file_id, file_section_ids in groupby(ids, key=self.file_ids.__getitem__):
+            try:
+                with open(self.root / self.files[file_id], "rb") as f:
+                    st = os.fstat(f.fileno())
+                    up_to_date = (st.st_mtime_ns, st.st_size) == self.file_stats[file_id]
+                    buf = f.read()
+            except FileNotFoundError:
+                LOGGER.warning(f"{self.files[file_id]} was deleted since the collection was refreshed")
+                buf = None
+
+            for i in file_section_ids:
+                if buf is None:
+                    yield i, ""
+                elif up_to_date:
+                    yield i, _decode_content(buf[self.starts[i]:self.ends[i]])
+                else:
+                    yield i, _decode_content(self._rescan_content(i, buf))
+
+    def text(self, i: int) -> str:
+        """Return header and content of the section as a single string."""
+        return f"{self.headers[i]}\n\n{self.content(i)}"
+
+    def iter_texts(self, ids: Optional[Iterable[int]] = None) -> Iterator[tuple[int, str]]:
+        """Yield the ids and texts of the sections file by file, see iter_contents."""
+        for i, content in self.iter_contents(ids):
+            yield i, f"{self.headers[i]}\n\n{content}"
+
+    def get_many(self, ids: Iterable[int]) -> list[dict[str, str]]:
+        """Return the sections in the given order, reading their files once (see __getitem__)."""
+        ids = list(ids)
+        contents = dict(self.iter_contents(ids))
+        return [
+            {"file": self.file(i), "header": self.headers[i], "content": contents[i], "sha256": self.hashes[i]}
+            for i in ids
+        ]
+
+    def append_file(self, rel_path: str, record: dict[str, Any]) -> None:
+        """Append the sections of a file given its manifest record (see scan_markdown_file)."""
+        file_id = len(self.files)
+        self.files.append(rel_path)
+        self.file_stats.append((record["mtime_ns"], record["size"]))
+        for section in record["sections"]:
+            self.file_ids.append(file_id)
+            self.starts.append(section["start"])
+            self.ends.append(section["end"])
+            self.headers.append(section["header"])
+            self.hashes.append(section["sha256"])
+
+    def _rescan_content(self, i: int, buf: bytes) -> bytes:
+        """Return the content of the section in the current content of its file, empty if it is gone.
+
+        The section is found by its hash if it was only moved, by its header
+        if it was modified.
+        """
+        rel_path = self.file(i)
+        LOGGER.warning(f"{rel_path} changed since the collection was refreshed, looking for {self.headers[i]!r} again")
+        by_header = None
+        for header_start, content_start, content_end in iter_section_spans(buf):
+            section_hash = hashlib.sha256(rel_path.encode("utf-8") + b"\0")
+            section_hash.update(buf[header_start:content_end])
+            if section_hash.hexdigest() == self.hashes[i]:
+                return buf[content_start:content_end]
+
+            header = buf[header_start:content_start].decode("utf-8", errors="replace").strip()
+            if by_header is None and header == self.headers[i]:
+                by_header = buf[content_start:content_end]
+        return by_header if by_header is not None else b""
+
+
+def _decode_content(raw_content: bytes) -> str:
+    return raw_content.decode("utf-8", errors="replace").replace("\r\n", "\n").strip()
+
+
+class MarkdownCollection:
+    """Markdown files of a collection together with their parsed sections.
+
+    The section spans are persisted in a manifest along with mtime, size and
+    content hash of each file so that only added, modified or deleted files are
+    processed when the collection is refreshed. For an unchanged collection, a
+    refresh boils down to a single stat pass. When many files need to be
+    scanned (e.g., cold index), they are sharded across a pool of processes.
+    """
+    manifest_filename = "manifest.json"
+    manifest_version = 2
+
+    def __init__(
+        self,
+        root: os.PathLike,
+        cache_dir: os.PathLike,
+        excluded_filenames: tuple[str, ...] = ("definitions.md",),
+        n_workers: Optional[int] = None,
+        min_files_for_multiprocessing: int = 64,
+    ) -> None:
+        self.root = Path(root)
+        self.cache_dir = Path(cache_dir)
+        self.excluded_filenames = excluded_filenames
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.min_files_for_multiprocessing = min_files_for_multiprocessing
+        self.files: dict[str, dict[str, Any]] = {}
+        self._load_manifest()
+
+    @classmethod
+    def from_config(cls, name: str, cfg: DictConfig) -> "MarkdownCollection":
+        return cls(
+            root=cfg.markdown_collections[name].path,
+            cache_dir=Path(cfg.cache_dir) / "collections" / name,
+            n_workers=cfg.collections.scan_workers,
+            min_files_for_multiprocessing=cfg.collections.min_files_for_multiprocessing,
+        )
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.cache_dir / self.manifest_filename
+
+    def refresh(self, rel_paths: Optional[Iterable[str]] = None) -> CollectionChanges:
+        """Re-scan the added and modified files, drop the deleted ones and return what changed.
+
+        If rel_paths is given (e.g., the files a watcher saw being touched),
+        only these files are checked and the others are assumed unchanged.
+        """
+        changes = CollectionChanges()
+        if rel_paths is None:
+            stats = {
+                str(p.relative_to(self.root)): p.stat()
+                for p in self.root.rglob("*.md") if p.name not in self.excluded_filenames
+            }
+            checked = set(self.files) | set(stats)
+        else:
+            stats = {}
+            checked = set()
+            for rel_path in rel_paths:
+                p = self.root / rel_path
+                if p.suffix != ".md" or p.name in self.excluded_filenames:
+                    continue
+
+                checked.add(rel_path)
+                if p.is_file():
+                    stats[rel_path] = p.stat()
+
+        to_scan = []
+        for rel_path, st in stats.items():
+            record = self.files.get(rel_path)
+            if record is None or record["mtime_ns"] != st.st_mtime_ns or record["size"] != st.st_size:
+                to_scan.append(rel_path)
+
+        for rel_path, new_record in zip(to_scan, self._scan_files(to_scan)):
+            record = self.files.get(rel_path)
+            if record is not None and record["sha256"] == new_record["sha256"]:  # touched but not modified
+                record["mtime_ns"] = new_record["mtime_ns"]
+                record["size"] = new_record["size"]
+                continue
+
+            self.files[rel_path] = new_record
+            if record is None:
+                changes.added.append(rel_path)
+            else:
+                changes.modified.append(rel_path)
+
+        for rel_path in sorted(checked - set(stats)):
+            if rel_path in self.files:
+                del self.files[rel_path]
+                changes.deleted.append(rel_path)
+
+        if to_scan or changes:
+            self._save_manifest()
+
+        return changes
+
+    def _scan_files(self, rel_paths: list[str]) -> list[dict[str, Any]]:
+        paths = [self.root / rel_path for rel_path in rel_paths]
+        if self.n_workers <= 1 or len(rel_paths) < self.min_files_for_multiprocessing:
+            return list(map(scan_markdown_file, paths, rel_paths))
+
+        chunksize = max(1, len(rel_paths) // (4 * self.n_workers))
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            return list(executor.map(scan_markdown_file, paths, rel_paths, chunksize=chunksize))
+
+    def sections(self) -> CollectionSections:
+        sections = CollectionSections(self.root)
+        for rel_path in sorted(self.files.keys()):
+            sections.append_file(rel_path, self.files[rel_path])
+        return sections
+
+    def _load_manifest(self) -> None:
+        if not self.manifest_path.exists():
+            return
+
+        with open(self.manifest_path, "r") as f:
+            manifest = json.load(f)
+
+        if manifest.get("version") == self.manifest_version and manifest.get("root") == str(self.root):
+            self.files = manifest["files"]
+
+    def _save_manifest(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Unique so that instances refreshing the same collection concurrently (e.g., the summarize
+        # thread of the serve mode and a search) never write to the same file
+        tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": self.manifest_version,
+                "root": str(self.root),
+                "files": self.files,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def scan_markdown_file(path: Path, rel_path: str) -> dict[str, Any]:
+    """Return the manifest record of a markdown file: its stat, content hash and section spans."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return {
+                "mtime_ns": st.st_mtime_ns,
+                "size": 0,
+                "sha256": hashlib.sha256(b"").hexdigest(),
+                "sections": [],
+            }
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            sections = []
+            for header_start, content_start, content_end in iter_section_spans(mm):
+                section_hash = hashlib.sha256(rel_path.encode("utf-8") + b"\0")
+                section_hash.update(mm[header_start:content_end])
+                sections.append({
+                    "header": mm[header_start:content_start].decode("utf-8").strip(),
+                    "start": content_start,
+                    "end": content_end,
+                    "sha256": section_hash.hexdigest(),
+                })
+
+            return {
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                "sha256": hashlib.sha256(mm).hexdigest(),
+                "sections": sections,
+            }
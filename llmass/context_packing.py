@@ -0,0 +1,177 @@
+"""Fitting large markdown notes into a token budget.
+
+warmup, relax and projects send a whole note with every question. Once a note
+grows beyond the budget, only its preamble (the text before the first header)
+and the sections most relevant to the question (BM25, as the lexical search
+ranker) are sent, in their original order. Given the summaries made by the
+summarize mode (projects), the other sections are sent as their summaries as
+long as they fit, and the summary of the whole note follows the preamble.
+In a dialogue, the note is packed again only for the questions about sections
+the note sent so far lacks, see Conversation.
+"""
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+from typing import Optional
+
+from omegaconf import DictConfig
+
+from llmass.classification import estimate_n_tokens
+from llmass.client import LlmClient
+from llmass.lexical_index import bm25_scores, tokenize
+from llmass.summaries import SummaryStore
+from llmass.utils.markdown import iter_section_spans
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _Section:
+    text: str
+    n_tokens: int
+    terms: Counter
+    summary: Optional[str] = None  # header and summary of the section
+    summary_n_tokens: int = 0
+
+
+class ContextPacker:
+    """Packs the sections of a document most relevant to a question into max_tokens.
+
+    A document within the budget is always returned unchanged, so the prompt,
+    and thus the KV cache the server keeps for it, does not depend on the
+    question. Sections are split by headers as in MdParser.iter_sections.
+    """
+    omission_marker = "[...]"
+
+    def __init__(
+        self,
+        document: str,
+        max_tokens: int,
+        count_tokens: Callable[[str], int],
+        summaries: Optional[SummaryStore] = None,
+    ) -> None:
+        self.document = document
+        self.max_tokens = max_tokens
+        self.n_tokens = count_tokens(document)
+        self._preamble = document
+        self._preamble_n_tokens = self.n_tokens
+        self._sections: list[_Section] = []
+        self._marker_n_tokens = count_tokens(self.omission_marker)
+        if self.n_tokens <= max_tokens:
+            return
+
+        buf = document.encode("utf-8")
+        spans = list(iter_section_spans(buf))
+        self._preamble = buf[:spans[0][0]].decode("utf-8").strip() if spans else document
+        document_summary = summaries.get("file", document) if summaries is not None else None
+        if document_summary is not None:
+            self._preamble = "\n\n".join(filter(None, [self._preamble, f"[Summary of the note: {document_summary}]"]))
+        self._preamble_n_tokens = count_tokens(self._preamble)
+        for header_start, content_start, content_end in spans:
+            text = buf[header_start:content_end].decode("utf-8").strip()
+            section = _Section(text, count_tokens(text), Counter(tokenize(text)))
+            if summaries is not None:
+                # Keyed by the section text as CollectionSections.text gives it
+                header = buf[header_start:content_start].decode("utf-8").strip()
+                key_text = f"{header}\n\n{buf[content_start:content_end].decode('utf-8').strip()}"
+                summary = summaries.get("section", key_text) if summaries.needs_summary(key_text) else None
+                if summary is not None:
+                    section.summary = f"{header}\n\n[Summary: {summary}]"
+                    section.summary_n_tokens = count_tokens(section.summary)
+            self._sections.append(section)
+
+    @property
+    def fits(self) -> bool:
+        """Whether the document is sent unchanged whatever the question."""
+        return self.n_tokens <= self.max_tokens or not self._sections
+
+    def pack(self, question: str) -> str:
+        if self.fits:
+            return self.document
+
+        return self.render(*self.select(question))
+
+    def select(self, question: str) -> tuple[set[int], set[int]]:
+        """Return the indices of the sections to send in full and of the ones to send as summaries."""
+        scores = bm25_scores(question, [section.terms for section in self._sections])
+        # Best sections first, earlier ones first among equally relevant (e.g., not matching at all)
+        ranking = sorted(range(len(self._sections)), key=lambda i: (-scores[i], i))
+        budget = self.max_tokens - self._preamble_n_tokens
+        # Summaries of all the sections first, except for the least relevant ones if even that is too much
+        summarized = {i for i, section in enumerate(self._sections) if section.summary is not None}
+        summaries_cost = sum(self._sections[i].summary_n_tokens + self._marker_n_tokens for i in summarized)
+        for i in reversed(ranking):
+            if summaries_cost <= budget:
+                break
+            if i in summarized:
+                summarized.remove(i)
+                summaries_cost -= self._sections[i].summary_n_tokens + self._marker_n_tokens
+        budget -= summaries_cost
+
+        # Then the full text of the most relevant ones
+        selected = set()
+        for i in ranking:
+            section = self._sections[i]
+            cost = section.n_tokens + self._marker_n_tokens
+            if i in summarized:
+                cost -= section.summary_n_tokens + self._marker_n_tokens
+            if cost <= budget:
+                selected.add(i)
+                summarized.discard(i)
+                budget -= cost
+        return selected, summarized
+
+    def relevant_sections(self, question: str) -> set[int]:
+        """Return the indices of the sections sharing terms with the question that it would get in full."""
+        scores = bm25_scores(question, [section.terms for section in self._sections])
+        selected, _ = self.select(question)
+        return {i for i in selected if scores[i] > 0}
+
+    def render(self, selected: set[int], summarized: set[int]) -> str:
+        parts = [self._preamble] if self._preamble else []
+        for i, section in enumerate(self._sections):
+            if i in selected:
+                parts.append(section.text)
+            elif i in summarized:
+                parts.append(section.summary)
+            elif not parts or parts[-1] != self.omission_marker:
+                parts.append(self.omission_marker)
+        LOGGER.info(
+            f"Document of {self.n_tokens} tokens cut down to {len(selected)} of {len(self._sections)} "
+            f"sections and {len(summarized)} summaries to fit into {self.max_tokens} tokens"
+        )
+        return "\n\n".join(parts)
+
+
+def make_token_counter(llm_client: LlmClient) -> Callable[[str], int]:
+    """Count tokens with the tokenizer of the LLM server if its URL is set, estimate them otherwise."""
+    if llm_client.tokenize_url is None:
+        return estimate_n_tokens
+
+    tokenizer_failed = False
+
+    def count_tokens(text: str) -> int:
+        nonlocal tokenizer_failed
+        if not tokenizer_failed:
+            try:
+                return len(llm_client.tokenize(text))
+            except Exception as e:
+                LOGGER.warning(f"Cannot count tokens with the LLM server tokenizer, estimating them instead: {e}")
+                tokenizer_failed = True
+        return estimate_n_tokens(text)
+
+    return count_tokens
+
+
+def context_packer_from_config(
+    document: str,
+    cfg: DictConfig,
+    llm_client: LlmClient,
+    summaries: Optional[SummaryStore] = None,
+) -> Optional[ContextPacker]:
+    if not cfg.enabled:
+        return None
+
+    return ContextPacker(document, cfg.max_tokens, make_token_counter(llm_client), summaries)
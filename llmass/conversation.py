@@ -0,0 +1,156 @@
+"""Conversation about a note with a token-budgeted history.
+
+Every request starts with the same system message holding the system prompt
+and the note, so the server reuses its KV cache from one turn to the next and
+only the latest question is prefilled. A note over the context packing budget
+is packed for the first question and packed again, at the cost of a new
+prefix, only when a later question is about sections it lacks.
+
+The turns follow the system message verbatim until they exceed
+history_max_tokens. Then the oldest ones (all but the last min_recent_turns)
+are replaced by an LLM-written summary appended to the system message, which
+keeps the cost of a turn bounded however long the session is.
+"""
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+from typing import Optional
+
+from omegaconf import DictConfig
+
+from llmass.client import LlmClient
+from llmass.context_packing import ContextPacker, make_token_counter
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _Turn:
+    question: str
+    answer: str
+    n_tokens: int
+
+
+class Conversation:
+    """Message history of a dialogue about a document, compacted to history_max_tokens.
+
+    If given, context_packer cuts the document down to the sections relevant
+    to the first question. The packed document is kept as long as it has the
+    sections the next questions would get in full.
+    """
+    def __init__(
+        self,
+        llm_client: LlmClient,
+        prompts: DictConfig,
+        document_prompts: DictConfig,
+        document: str,
+        count_tokens: Callable[[str], int],
+        history_max_tokens: int = 2000,
+        min_recent_turns: int = 2,
+        summary_max_tokens: Optional[int] = 300,
+        context_packer: Optional[ContextPacker] = None,
+    ) -> None:
+        self.llm_client = llm_client
+        self.prompts = prompts  # compaction prompts
+        self.document_prompts = document_prompts  # system prompt, user prompt prefix and suffix of the mode
+        self.document = document
+        self.count_tokens = count_tokens
+        self.history_max_tokens = history_max_tokens
+        self.min_recent_turns = min_recent_turns
+        self.summary_max_tokens = summary_max_tokens
+        self.summary: Optional[str] = None
+        self._turns: list[_Turn] = []
+        self.context_packer = context_packer
+        self._sent_sections: Optional[set[int]] = None  # sections of the packed document sent in full
+
+    def messages(self, question: str) -> list[dict[str, str]]:
+        """Return the messages asking the question in the context of the conversation so far."""
+        if self.context_packer is not None and not self.context_packer.fits:
+            self._pack_document(question)
+
+        system_content = "\n\n".join([
+            self.document_prompts.system_prompt,
+            self.document_prompts.user_prompt_prefix,
+            self.document,
+        ])
+        if self.summary is not None:
+            system_content += f"\n\n{self.prompts.summary_prefix} {self.summary}"
+
+        messages = [{"role": "system", "content": system_content}]
+        for turn in self._turns:
+            messages.append({"role": "user", "content": turn.question})
+            messages.append({"role": "assistant", "content": turn.answer})
+        messages.append({"role": "user", "content": " ".join([question, self.document_prompts.user_prompt_suffix])})
+        return messages
+
+    def _pack_document(self, question: str) -> None:
+        if self._sent_sections is not None and self.context_packer.relevant_sections(question) <= self._sent_sections:
+            return
+
+        if self._sent_sections is not None:
+            LOGGER.info("The question is about sections missing from the packed note, packing it again")
+        selected, summarized = self.context_packer.select(question)
+        self.document = self.context_packer.render(selected, summarized)
+        self._sent_sections = selected
+
+    def add_turn(self, question: str, answer: str) -> None:
+        self._turns.append(_Turn(question, answer, self.count_tokens(question) + self.count_tokens(answer)))
+        self._compact()
+
+    def _compact(self) -> None:
+        n_tokens = sum(turn.n_tokens for turn in self._turns)
+        n_compacted = 0
+        while n_tokens > self.history_max_tokens and len(self._turns) - n_compacted > self.min_recent_turns:
+            n_tokens -= self._turns[n_compacted].n_tokens
+            n_compacted += 1
+        if n_compacted == 0:
+            return
+
+        transcript = "\n\n".join(
+            f"Me: {turn.question}\n\nAssistant: {turn.answer}" for turn in self._turns[:n_compacted]
+        )
+        params = {"max_tokens": self.summary_max_tokens} if self.summary_max_tokens is not None else {}
+        self.summary = self.llm_client.chat(
+            [
+                {"role": "system", "content": self.prompts.compaction_system_prompt},
+                {
+                    "role": "user",
+                    "content": "\n\n".join([
+                        self.prompts.compaction_user_prompt_prefix,
+                        f"Summary: {self.summary or ''}",
+                        transcript,
+                    ]),
+                },
+            ],
+            role="summarization",
+            **params,
+        ).strip()
+        del self._turns[:n_compacted]
+        LOGGER.info(
+            f"Compacted {n_compacted} turns of the conversation into a summary, {len(self._turns)} turns "
+            f"of {n_tokens} tokens are kept verbatim"
+        )
+
+
+def conversation_from_config(
+    document: str,
+    cfg: DictConfig,
+    llm_client: LlmClient,
+    document_prompts: DictConfig,
+    context_packer: Optional[ContextPacker] = None,
+) -> Optional[Conversation]:
+    if not cfg.enabled:
+        return None
+
+    return Conversation(
+        llm_client=llm_client,
+        prompts=cfg.prompts,
+        document_prompts=document_prompts,
+        document=document,
+        count_tokens=make_token_counter(llm_client),
+        history_max_tokens=cfg.history_max_tokens,
+        min_recent_turns=cfg.min_recent_turns,
+        summary_max_tokens=cfg.summary_max_tokens,
+        context_packer=context_packer,
+    )
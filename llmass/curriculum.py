@@ -0,0 +1,280 @@
+"""Index of the study notes and the pool of study questions prepared in advance."""
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from datetime import date
+import json
+import logging
+import os
+from pathlib import Path
+import random
+import re
+import threading
+from typing import Any, Optional
+
+from llmass.utils.common import get_markdown_filenames
+from llmass.utils.markdown import MdParser
+from llmass.utils.sampling import AliasSampler
+
+
+LOGGER = logging.getLogger(__name__)
+DATE_PATTERN = re.compile(r"(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})")
+
+
+class StudyCurriculum:
+    """Subtopics of all the topics of all the subjects in the study dir.
+
+    A subject is a subdir of the study dir, a topic is a markdown file in it
+    following the study schema and its subtopics are the non-empty Topic cells
+    of its current_state table. A topic file is parsed again only if its mtime
+    or size changes, the parsed subtopics are kept in a JSON index between runs.
+
+    Subtopics are sampled with weights growing with the number of days since
+    they were last mentioned in the dated notes (capped by
+    max_review_interval_days, which is also the weight of the ones never
+    mentioned) so that the least recently reviewed ones are asked more often.
+    """
+    index_version = 1
+
+    def __init__(
+        self,
+        study_path: os.PathLike,
+        index_path: os.PathLike,
+        schema: dict[str, str],
+        excluded_filenames: tuple[str, ...] = ("definitions.md",),
+        max_review_interval_days: int = 30,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.study_path = Path(study_path)
+        self.index_path = Path(index_path)
+        self.schema = schema
+        self.excluded_filenames = excluded_filenames
+        self.max_review_interval_days = max_review_interval_days
+        self._rng = rng or random.Random()
+        self._topics: dict[str, dict[str, Any]] = self._load_index()
+        self._samplers: dict[str, tuple[int, date, AliasSampler]] = {}
+        self._lock = threading.Lock()
+
+    def subjects(self) -> list[str]:
+        return [d.name for d in self.study_path.iterdir() if d.is_dir()]
+
+    def topics(self, subject: str) -> list[str]:
+        return get_markdown_filenames(p=self.study_path / subject, excluded_filenames=self.excluded_filenames)
+
+    def refresh(self) -> None:
+        """Parse the topic files changed since the index was saved, in all the subjects."""
+        with self._lock:
+            seen = set()
+            changed = False
+            for subject in self.subjects():
+                for topic in self.topics(subject):
+                    key = _topic_key(subject, topic)
+                    seen.add(key)
+                    changed |= self._refresh_topic(key, self.study_path / subject / topic)
+
+            for key in set(self._topics) - seen:
+                del self._topics[key]
+                changed = True
+            if changed:
+                self._save_index()
+
+    def topic_version(self, subject: str, topic: str) -> int:
+        """Return a number changing whenever the topic file does (its mtime)."""
+        with self._lock:
+            key = _topic_key(subject, topic)
+            if self._refresh_topic(key, self.study_path / subject / topic):
+                self._save_index()
+            return self._topics[key]["mtime_ns"]
+
+    def subtopics(self, subject: str, topic: str) -> list[str]:
+        with self._lock:
+            key = _topic_key(subject, topic)
+            if self._refresh_topic(key, self.study_path / subject / topic):
+                self._save_index()
+            return [subtopic["name"] for subtopic in self._topics[key]["subtopics"]]
+
+    def sample_subtopic(self, subject: str, topic: str) -> str:
+        """Return a random non-empty subtopic of the topic, the least recently reviewed ones are more likely."""
+        with self._lock:
+            key = _topic_key(subject, topic)
+            if self._refresh_topic(key, self.study_path / subject / topic):
+                self._save_index()
+
+            entry = self._topics[key]
+            subtopics = entry["subtopics"]
+            if not subtopics:
+                raise ValueError(f"There are no non-empty topics in the current state table of {subject}/{topic}")
+
+            today = date.today()
+            cached = self._samplers.get(key)
+            if cached is None or cached[:2] != (entry["mtime_ns"], today):
+                weights = [self._review_weight(subtopic["last_reviewed"], today) for subtopic in subtopics]
+                cached = (entry["mtime_ns"], today, AliasSampler(weights, self._rng))
+                self._samplers[key] = cached
+
+            return subtopics[cached[2].sample()]["name"]
+
+    def _review_weight(self, last_reviewed: Optional[str], today: date) -> float:
+        if last_reviewed is None:
+            return float(self.max_review_interval_days)
+        days = (today - date.fromisoformat(last_reviewed)).days
+        return float(min(max(days, 1), self.max_review_interval_days))
+
+    def _refresh_topic(self, key: str, path: Path) -> bool:
+        stat = path.stat()
+        entry = self._topics.get(key)
+        if entry is not None and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return False
+
+        self._topics[key] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "subtopics": self._parse_subtopics(path),
+        }
+        return True
+
+    def _parse_subtopics(self, path: Path) -> list[dict[str, Optional[str]]]:
+        try:
+            d = MdParser(path, self.schema).parse()
+        except (KeyError, ValueError) as e:
+            LOGGER.warning(f"Cannot parse study notes {path}: {e!r}")
+            return []
+
+        notes = []
+        for raw_date, text in (d.get("notes") or {}).items():
+            m = DATE_PATTERN.search(raw_date)
+            if m is not None:
+                try:
+                    notes.append((date(*map(int, m.groups())), text.lower()))
+                except ValueError:  # e.g., 2024.02.30
+                    continue
+        notes.sort(reverse=True)
+
+        subtopics = []
+        for row in d.get("current_state") or []:
+            name = row.get("Topic", "").strip()
+            if not name:  # empty cells are skipped once here instead of on every sample
+                continue
+
+            last_reviewed = next((note_date for note_date, text in notes if name.lower() in text), None)
+            subtopics.append({
+                "name": name,
+                "last_reviewed": last_reviewed.isoformat() if last_reviewed is not None else None,
+            })
+        return subtopics
+
+    def _load_index(self) -> dict[str, dict[str, Any]]:
+        try:
+            index = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if index.get("version") != self.index_version:
+            return {}
+        return index["topics"]
+
+    def _save_index(self) -> None:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"version": self.index_version, "topics": self._topics}, ensure_ascii=False))
+        os.replace(tmp_path, self.index_path)
+
+
+class StudyQuestionPool:
+    """Study questions generated in advance, up to pool_size per topic.
+
+    Taking a question schedules generating a replacement in the background
+    unless prefetch is False. The pool is kept in a JSON file, so questions
+    prepared by a long-running process (e.g., the server) are served
+    instantly by the next one-shot run. Questions about a previous version of
+    the topic file are dropped.
+    """
+    def __init__(
+        self,
+        path: os.PathLike,
+        curriculum: StudyCurriculum,
+        generate_question: Callable[[str, str], str],
+        pool_size: int = 2,
+        max_workers: int = 2,
+    ) -> None:
+        self.path = Path(path)
+        self.curriculum = curriculum
+        self.generate_question = generate_question  # (subject, subtopic) -> question
+        self.pool_size = pool_size
+        self._pool: dict[str, list[dict[str, Any]]] = self._load()
+        self._n_pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+
+    def take(self, subject: str, topic: str, prefetch: bool = True) -> tuple[str, str]:
+        """Return a subtopic of the topic and a question about it, generating them right away if none is ready."""
+        version = self.curriculum.topic_version(subject, topic)
+        key = _topic_key(subject, topic)
+        with self._lock:
+            questions = [q for q in self._pool.get(key, []) if q["topic_version"] == version]
+            question = questions.pop(0) if questions else None
+            self._pool[key] = questions
+            if question is not None:
+                self._save()
+
+        if question is None:
+            subtopic = self.curriculum.sample_subtopic(subject, topic)
+            question = {"subtopic": subtopic, "question": self.generate_question(subject, subtopic)}
+        if prefetch:
+            self.prefetch(subject, topic)
+        return question["subtopic"], question["question"]
+
+    def prefetch(self, subject: str, topic: str) -> None:
+        """Start generating questions in the background until pool_size of them are ready for the topic."""
+        if not self.curriculum.subtopics(subject, topic):
+            return  # nothing to ask about, take() reports it
+
+        version = self.curriculum.topic_version(subject, topic)
+        key = _topic_key(subject, topic)
+        with self._lock:
+            questions = [q for q in self._pool.get(key, []) if q["topic_version"] == version]
+            self._pool[key] = questions
+            n_missing = self.pool_size - len(questions) - self._n_pending[key]
+            self._n_pending[key] += max(0, n_missing)
+        for _ in range(n_missing):
+            # In the context of the caller to attribute the LLM calls to its mode
+            self._executor.submit(contextvars.copy_context().run, self._generate, subject, topic)
+
+    def close(self) -> None:
+        """Drop the questions not being generated yet, the ones being generated are still stored."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _generate(self, subject: str, topic: str) -> None:
+        key = _topic_key(subject, topic)
+        try:
+            version = self.curriculum.topic_version(subject, topic)
+            subtopic = self.curriculum.sample_subtopic(subject, topic)
+            question = self.generate_question(subject, subtopic)
+        except Exception as e:
+            LOGGER.warning(f"Cannot prepare a study question for {key}: {e!r}")
+            return
+        finally:
+            with self._lock:
+                self._n_pending[key] -= 1
+
+        with self._lock:
+            self._pool.setdefault(key, []).append(
+                {"subtopic": subtopic, "question": question, "topic_version": version}
+            )
+            self._save()
+
+    def _load(self) -> dict[str, list[dict[str, Any]]]:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(self._pool, ensure_ascii=False))
+        os.replace(tmp_path, self.path)
+
+
+def _topic_key(subject: str, topic: str) -> str:
+    return f"{subject}/{topic}"
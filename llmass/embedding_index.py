@@ -0,0 +1,131 @@
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from llmass.collection import CollectionSections
+
+
+EmbedFunction = Callable[[list[str]], list[list[float]]]
+
+
+class EmbeddingIndex:
+    """On-disk vector index over the sections of a single markdown collection.
+
+    Embeddings are stored as an L2-normalized float32 matrix in the .npy format
+    so that they can be memory-mapped. Row i of the matrix corresponds to line i
+    of the sidecar metadata table (JSON lines) holding the file, the header and
+    the hash of the section.
+    """
+    matrix_filename = "embeddings.npy"
+    metadata_filename = "sections.jsonl"
+
+    def __init__(self, index_dir: os.PathLike) -> None:
+        self.index_dir = Path(index_dir)
+        self.matrix: Optional[np.ndarray] = None
+        self.metadata: list[dict[str, str]] = []
+        self._load()
+
+    @property
+    def matrix_path(self) -> Path:
+        return self.index_dir / self.matrix_filename
+
+    @property
+    def metadata_path(self) -> Path:
+        return self.index_dir / self.metadata_filename
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def update(
+        self,
+        sections: CollectionSections,
+        embed: EmbedFunction,
+        batch_size: int = 64,
+    ) -> int:
+        """Bring the index in sync with sections and return the number of newly embedded ones.
+
+        Rows of unchanged sections are copied from the existing matrix, only
+        added or modified sections are sent to the embedding endpoint.
+        """
+        hashes = sections.hashes
+        if self.matrix is not None and hashes == [m["sha256"] for m in self.metadata]:
+            return 0
+
+        old_rows = {m["sha256"]: i for i, m in enumerate(self.metadata)}
+        to_embed = [i for i, h in enumerate(hashes) if h not in old_rows]
+        new_vectors = {}
+        for batch_start in range(0, len(to_embed), batch_size):
+            batch = to_embed[batch_start:batch_start + batch_size]
+            texts = dict(sections.iter_texts(batch))
+            vectors = embed([texts[i] for i in batch])
+            for i, v in zip(batch, vectors):
+                new_vectors[i] = _normalize(np.asarray(v, dtype=np.float32))
+
+        if new_vectors:
+            dim = len(next(iter(new_vectors.values())))
+        elif self.matrix is not None:
+            dim = self.matrix.shape[1]
+        else:
+            dim = 0
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_matrix_path = self.matrix_path.with_suffix(".tmp.npy")
+        matrix = np.lib.format.open_memmap(
+            tmp_matrix_path, mode="w+", dtype=np.float32, shape=(len(sections), dim),
+        )
+        for i, h in enumerate(hashes):
+            if i in new_vectors:
+                matrix[i] = new_vectors[i]
+            else:
+                matrix[i] = self.matrix[old_rows[h]]
+        matrix.flush()
+        del matrix
+
+        tmp_metadata_path = self.metadata_path.with_suffix(".tmp")
+        with open(tmp_metadata_path, "w") as f:
+            for i, h in enumerate(hashes):
+                f.write(json.dumps({
+                    "file": sections.file(i),
+                    "header": sections.headers[i],
+                    "sha256": h,
+                }, ensure_ascii=False) + "\n")
+
+        self.matrix = None  # release the memory map before replacing the file
+        os.replace(tmp_matrix_path, self.matrix_path)
+        os.replace(tmp_metadata_path, self.metadata_path)
+        self._load()
+
+        return len(new_vectors)
+
+    def top_k(self, query_vector: list[float], k: int) -> list[tuple[dict[str, str], float]]:
+        """Return metadata of up to k sections most similar to the query, best first."""
+        if self.matrix is None or len(self) == 0:
+            return []
+
+        q = _normalize(np.asarray(query_vector, dtype=np.float32))
+        scores = self.matrix @ q
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.metadata[i], float(scores[i])) for i in best]
+
+    def _load(self) -> None:
+        if not (self.matrix_path.exists() and self.metadata_path.exists()):
+            return
+
+        self.matrix = np.load(self.matrix_path, mmap_mode="r")
+        with open(self.metadata_path, "r") as f:
+            self.metadata = [json.loads(l) for l in f]
+
+        if self.matrix.shape[0] != len(self.metadata):  # broken index, rebuild from scratch
+            self.matrix = None
+            self.metadata = []
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
@@ -1,76 +1,195 @@
-import requests
-import json
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Optional
 
-from llmass.utils.common import print_llm_output
+from llmass.client import ChatStream, LlmClient
+from llmass.utils.common import print_llm_output, print_llm_output_streaming
 from llmass.utils.console import console, prompt_user
 
+if TYPE_CHECKING:
+    from llmass.conversation import Conversation
+
 
 def compose_user_prompt(
     user_prompt_prefix: str,
     user_prompt_question: str,
     user_prompt_suffix: str,
     user_prompt_extra_content: str,
+    extra_content_first: bool = False,
 ) -> str:
+    if extra_content_first:
+        # Static content goes first and the question last so that the server can reuse
+        # the KV cache of the common prompt prefix across questions about the same document
+        return user_prompt_prefix + "\n\n" + user_prompt_extra_content + "\n\n" + " ".join([user_prompt_question, user_prompt_suffix])
+
     return " ".join([user_prompt_prefix, user_prompt_question, user_prompt_suffix]) + "\n\n" + user_prompt_extra_content 
 
 
+def compose_messages(
+    system_prompt: str, 
+    user_prompt_prefix: str,
+    user_prompt_question: str,
+    user_prompt_suffix: str,
+    user_prompt_extra_content: str,
+    extra_content_first: bool = False,
+) -> list[dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": compose_user_prompt(
+                user_prompt_prefix,
+                user_prompt_question,
+                user_prompt_suffix,
+                user_prompt_extra_content,
+                extra_content_first,
+            ),
+        },
+    ]
+
+
 def single_message_non_dialogue_interaction_with_llm(
-    llm_server_url: str,
+    llm_client: LlmClient,
     system_prompt: str, 
     user_prompt_prefix: str,
     user_prompt_question: str,
     user_prompt_suffix: str,
     user_prompt_extra_content: str,
+    use_cache: Optional[bool] = None,
+    extra_content_first: bool = False,
+    role: str = "interactive",
 ) -> str:
-    r = requests.post(
-        llm_server_url,
-        headers={
-            "Content-Type": "application/json",
-        },
-        data=json.dumps({
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": compose_user_prompt(
-                        user_prompt_prefix,
-                        user_prompt_question,
-                        user_prompt_suffix,
-                        user_prompt_extra_content
-                    ),
-                },
-            ],
-        }),
+    return llm_client.chat(
+        messages=compose_messages(
+            system_prompt,
+            user_prompt_prefix,
+            user_prompt_question,
+            user_prompt_suffix,
+            user_prompt_extra_content,
+            extra_content_first,
+        ),
+        use_cache=use_cache,
+        role=role,
     )
-    response_json = json.loads(r.text)
-    assert len(response_json["choices"]) == 1, "Only single message in choices is supported"
 
-    return response_json["choices"][0]["message"]["content"]
+
+def printed_single_message_non_dialogue_interaction_with_llm(
+    llm_client: LlmClient,
+    system_prompt: str, 
+    user_prompt_prefix: str,
+    user_prompt_question: str,
+    user_prompt_suffix: str,
+    user_prompt_extra_content: str,
+    stream: bool = False,
+    extra_content_first: bool = False,
+    use_cache: Optional[bool] = None,
+) -> str:
+    if not stream:
+        llm_output = single_message_non_dialogue_interaction_with_llm(
+            llm_client=llm_client,
+            system_prompt=system_prompt, 
+            user_prompt_prefix=user_prompt_prefix,
+            user_prompt_question=user_prompt_question,
+            user_prompt_suffix=user_prompt_suffix,
+            user_prompt_extra_content=user_prompt_extra_content,
+            use_cache=use_cache,
+            extra_content_first=extra_content_first,
+        )
+        print_llm_output(llm_output)
+        return llm_output
+
+    chat_stream = llm_client.stream_chat(
+        messages=compose_messages(
+            system_prompt,
+            user_prompt_prefix,
+            user_prompt_question,
+            user_prompt_suffix,
+            user_prompt_extra_content,
+            extra_content_first,
+        ),
+        use_cache=use_cache,
+    )
+    return print_llm_output_streaming(chat_stream, stats=lambda: _format_stream_stats(chat_stream))
 
 
 def recurrent_non_dialogue_interaction_with_llm(
-    llm_server_url: str,
+    llm_client: LlmClient,
     system_prompt: str, 
     user_prompt_prefix: str,
     user_prompt_suffix: str,
     user_prompt_extra_content: str,
     stop_word: str = "stop",
+    stream: bool = False,
+    extra_content_first: bool = False,
+    pack_extra_content: Optional[Callable[[str], str]] = None,
 ) -> None:
+    """Answer user questions about the extra content until the stop word is entered.
+
+    If given, pack_extra_content maps every question to the extra content sent
+    with it (e.g., the sections of a large note relevant to the question).
+    """
     while True:
         q = prompt_user()
         if q == stop_word:
             break
 
-        llm_output = single_message_non_dialogue_interaction_with_llm(
-            llm_server_url=llm_server_url,
+        if pack_extra_content is not None:
+            user_prompt_extra_content = pack_extra_content(q)
+        printed_single_message_non_dialogue_interaction_with_llm(
+            llm_client=llm_client,
             system_prompt=system_prompt, 
             user_prompt_prefix=user_prompt_prefix,
             user_prompt_question=q,
             user_prompt_suffix=user_prompt_suffix,
             user_prompt_extra_content=user_prompt_extra_content,
+            stream=stream,
+            extra_content_first=extra_content_first,
         )
-        print_llm_output(llm_output)
 
+
+def dialogue_with_llm(
+    llm_client: LlmClient,
+    conversation: "Conversation",
+    stop_word: str = "stop",
+    stream: bool = False,
+    startup_question: Optional[str] = None,
+) -> None:
+    """Answer user questions until the stop word is entered, every answer knowing the previous ones.
+
+    If given, startup_question is asked first as if the user did.
+    """
+    q = startup_question
+    while True:
+        if q is None:
+            q = prompt_user()
+            if q == stop_word:
+                break
+
+        messages = conversation.messages(q)
+        if not stream:
+            llm_output = llm_client.chat(messages=messages)
+            print_llm_output(llm_output)
+        else:
+            chat_stream = llm_client.stream_chat(messages=messages)
+            llm_output = print_llm_output_streaming(chat_stream, stats=lambda: _format_stream_stats(chat_stream))
+        conversation.add_turn(q, llm_output)
+        q = None
+
+
+def _format_stream_stats(chat_stream: ChatStream) -> str:
+    if chat_stream.from_cache:
+        return "[dim]cached[/dim]"
+    if chat_stream.time_to_first_token is None:
+        return ""
+
+    stats = f"first token in {chat_stream.time_to_first_token:.2f} s"
+    if chat_stream.tokens_per_second is not None:
+        stats += f" · {chat_stream.tokens_per_second:.1f} tokens/s"
+    if chat_stream.prompt_usage.prompt_tokens:
+        stats += (
+            f" · {chat_stream.prompt_usage.cached_prompt_tokens}/{chat_stream.prompt_usage.prompt_tokens}"
+            " prompt tokens cached"
+        )
+    return f"[dim]{stats}[/dim]"
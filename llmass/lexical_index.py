@@ -0,0 +1,144 @@
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from llmass.collection import CollectionSections
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+CYRILLIC_PATTERN = re.compile(r"[а-я]")
+ENGLISH_SUFFIXES = ("ingly", "edly", "ing", "ies", "ed", "es", "ly", "s")
+RUSSIAN_STEM_LENGTH = 6  # Russian words are heavily inflected, keeping a prefix is a robust stemmer
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase lightly stemmed terms suitable for both Russian and English notes."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower().replace("ё", "е")):
+        if len(token) < 2 and not token.isdigit():
+            continue
+        tokens.append(_stem(token))
+    return tokens
+
+
+class LexicalIndex:
+    """BM25 inverted index over the sections of a collection stored in SQLite.
+
+    Sections are identified by their hashes so that the index can be updated
+    incrementally: only added or modified sections are tokenized.
+    """
+    def __init__(self, path: os.PathLike, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sections (sha256 TEXT PRIMARY KEY, length INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "term TEXT NOT NULL, sha256 TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, sha256)) "
+                "WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS postings_sha256 ON postings (sha256)")
+
+    def update(self, sections: CollectionSections) -> int:
+        """Bring the index in sync with sections and return the number of newly indexed ones."""
+        indexed = {row[0] for row in self._conn.execute("SELECT sha256 FROM sections")}
+        current = set(sections.hashes)
+        with self._conn:
+            for sha256 in indexed - current:
+                self._conn.execute("DELETE FROM sections WHERE sha256 = ?", (sha256,))
+                self._conn.execute("DELETE FROM postings WHERE sha256 = ?", (sha256,))
+
+            to_index = []
+            for i, sha256 in enumerate(sections.hashes):
+                if sha256 not in indexed:
+                    indexed.add(sha256)
+                    to_index.append(i)
+
+            for i, text in sections.iter_texts(to_index):
+                sha256 = sections.hashes[i]
+                terms = Counter(tokenize(text))
+                self._conn.execute(
+                    "INSERT INTO sections (sha256, length) VALUES (?, ?)", (sha256, sum(terms.values()))
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, sha256, tf) VALUES (?, ?, ?)",
+                    [(term, sha256, tf) for term, tf in terms.items()],
+                )
+
+        return len(to_index)
+
+    def top_k(self, query: str, k: int) -> list[tuple[str, float]]:
+        """Return hashes and BM25 scores of up to k sections matching the query, best first.
+
+        Sections sharing no term with the query are never returned.
+        """
+        n_sections, total_length = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM sections"
+        ).fetchone()
+        if n_sections == 0:
+            return []
+
+        avg_length = total_length / n_sections
+        scores: Counter = Counter()
+        for term in set(tokenize(query)):
+            postings = self._conn.execute(
+                "SELECT p.sha256, p.tf, s.length FROM postings p JOIN sections s ON s.sha256 = p.sha256 "
+                "WHERE p.term = ?",
+                (term,),
+            ).fetchall()
+            if not postings:
+                continue
+
+            idf = bm25_idf(n_sections, len(postings))
+            for sha256, tf, length in postings:
+                scores[sha256] += idf * bm25_tf(tf, length, avg_length, self.k1, self.b)
+
+        return scores.most_common(k)
+
+
+def bm25_scores(query: str, documents_terms: list[Counter], k1: float = 1.5, b: float = 0.75) -> list[float]:
+    """Return BM25 scores of the query against a small in-memory corpus of tokenized documents."""
+    scores = [0.0] * len(documents_terms)
+    if not documents_terms:
+        return scores
+
+    lengths = [sum(terms.values()) for terms in documents_terms]
+    avg_length = sum(lengths) / len(lengths) or 1.0
+    for term in set(tokenize(query)):
+        matching = [i for i, terms in enumerate(documents_terms) if term in terms]
+        if not matching:
+            continue
+
+        idf = bm25_idf(len(documents_terms), len(matching))
+        for i in matching:
+            scores[i] += idf * bm25_tf(documents_terms[i][term], lengths[i], avg_length, k1, b)
+
+    return scores
+
+
+def bm25_idf(n_documents: int, n_matching_documents: int) -> float:
+    return math.log(1 + (n_documents - n_matching_documents + 0.5) / (n_matching_documents + 0.5))
+
+
+def bm25_tf(tf: int, length: int, avg_length: float, k1: float, b: float) -> float:
+    norm = k1 * (1 - b + b * length / avg_length)
+    return tf * (k1 + 1) / (tf + norm)
+
+
+@lru_cache(maxsize=1 << 16)
+def _stem(token: str) -> str:
+    if CYRILLIC_PATTERN.search(token):
+        return token[:RUSSIAN_STEM_LENGTH]
+
+    for suffix in ENGLISH_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
@@ -0,0 +1,6 @@
+"""Modes of the assistant, one module per mode.
+
+The runner imports the module of the selected mode only (see the ``_target_``
+of the configs in config/mode), so starting one mode does not pay for the
+imports of the others, e.g., numpy for search or feedparser for recent papers.
+"""
@@ -0,0 +1,143 @@
+import logging
+from typing import Optional
+
+from omegaconf import DictConfig
+from rich.table import Table
+from rich.text import Text
+
+from llmass.utils.console import console
+
+from llmass.client import LlmClient
+from llmass.context_packing import context_packer_from_config
+from llmass.conversation import conversation_from_config
+from llmass.interaction import (
+    dialogue_with_llm,
+    printed_single_message_non_dialogue_interaction_with_llm,
+    recurrent_non_dialogue_interaction_with_llm,
+)
+from llmass.utils.common import transform_filename_to_capitalized_name
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def run_interaction_based_on_single_md_file(
+    md_path: str,
+    prompts: DictConfig,
+    llm_client: LlmClient,
+    stop_word: str,
+    ask_startup_question: bool,
+    stream: bool = False,
+    extra_content_first: bool = False,
+    context_packing: Optional[DictConfig] = None,
+    dialogue: Optional[DictConfig] = None,
+) -> None:
+    with open(md_path, "r") as f:
+        md_file_content = f.read()
+        context_packer = None
+        if context_packing is not None:
+            context_packer = context_packer_from_config(md_file_content, context_packing, llm_client)
+
+        conversation = None
+        if dialogue is not None:
+            conversation = conversation_from_config(
+                md_file_content,
+                dialogue,
+                llm_client,
+                prompts,
+                context_packer=context_packer,
+            )
+        if conversation is not None:
+            dialogue_with_llm(
+                llm_client=llm_client,
+                conversation=conversation,
+                stop_word=stop_word,
+                stream=stream,
+                startup_question=prompts.user_prompt_question_at_startup if ask_startup_question else None,
+            )
+            return
+
+        if ask_startup_question:
+            printed_single_message_non_dialogue_interaction_with_llm(
+                llm_client=llm_client,
+                system_prompt=prompts.system_prompt, 
+                user_prompt_prefix=prompts.user_prompt_prefix,
+                user_prompt_question=prompts.user_prompt_question_at_startup,
+                user_prompt_suffix=prompts.user_prompt_suffix,
+                user_prompt_extra_content=(
+                    context_packer.pack(prompts.user_prompt_question_at_startup)
+                    if context_packer is not None else md_file_content
+                ),
+                stream=stream,
+                extra_content_first=extra_content_first,
+                # The same prompt (with today's date in the suffix) means the same note asked about again today
+                use_cache=True,
+            )
+
+        recurrent_non_dialogue_interaction_with_llm(
+            llm_client=llm_client,
+            system_prompt=prompts.system_prompt, 
+            user_prompt_prefix=prompts.user_prompt_prefix,
+            user_prompt_suffix=prompts.user_prompt_suffix,
+            user_prompt_extra_content=md_file_content,
+            stop_word=stop_word,
+            stream=stream,
+            extra_content_first=extra_content_first,
+            pack_extra_content=context_packer.pack if context_packer is not None else None,
+        )
+
+
+def log_llm_client_stats(llm_client: LlmClient) -> None:
+    if llm_client.cache is not None:
+        stats = llm_client.cache.stats()
+        LOGGER.info(f"LLM response cache: {stats['hits']} hits, {stats['misses']} misses")
+
+    prompt_usage = llm_client.prompt_usage
+    if prompt_usage.prompt_tokens:
+        LOGGER.info(
+            f"Prompt tokens: {prompt_usage.prompt_tokens}, prefill skipped thanks to the server "
+            f"KV cache for {prompt_usage.cached_prompt_tokens} "
+            f"({100 * prompt_usage.cached_prompt_tokens / prompt_usage.prompt_tokens:.1f}%)"
+        )
+
+
+def print_mode_title(mode_func_name: str) -> None:
+    mode_name = mode_func_name.replace('_', ' ').upper() + " MODE"
+
+    console.print()
+    console.print(f"[bold blue on grey74]{mode_name:^{console.width}}[/bold blue on grey74]")
+    console.print()
+
+
+def print_list_with_numeric_options(
+    title: str,
+    files_or_dirs: list[str],
+    names: Optional[list[str]] = None,
+    descriptions: Optional[list[str]] = None,
+) -> None:
+    console.rule(f"[bold blue]{title.upper()}[/bold blue]", style="blue")
+    
+    table = Table(show_header=False, box=None, padding=(0, 2))
+    for i, file_or_dir in enumerate(files_or_dirs):
+        if names is not None:
+            name = names[i]
+        else:
+            name = transform_filename_to_capitalized_name(file_or_dir)
+
+        if descriptions is not None:
+            descr = descriptions[i]
+
+            table.add_row(
+                f"[cyan]{i + 1}[/cyan]",
+                Text(f"{name} - {descr}", style="green"),
+                f"[dim]({file_or_dir})[/dim]"
+            )
+        else:
+            table.add_row(
+                f"[cyan]{i + 1}[/cyan]",
+                Text(name, style="green"),
+                f"[dim]({file_or_dir})[/dim]"
+            )
+
+    console.print(table)
+    console.print()
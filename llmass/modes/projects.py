@@ -0,0 +1,66 @@
+from pathlib import Path
+
+from omegaconf import DictConfig
+
+from llmass.client import get_llm_client
+from llmass.context_packing import context_packer_from_config
+from llmass.conversation import conversation_from_config
+from llmass.interaction import dialogue_with_llm, recurrent_non_dialogue_interaction_with_llm
+from llmass.modes.common import print_list_with_numeric_options, print_mode_title
+from llmass.summaries import summary_store_from_config
+from llmass.utils.common import get_markdown_filenames, prompt_until_satisfied
+
+
+def projects(project_path: str, cfg: DictConfig) -> None:
+    print_mode_title(projects.__name__)
+    # Collect all the project files in the project dir
+    project_md_files = []
+    excluded_filenames = (
+        "definitions.md",
+    )
+    project_path = Path(project_path)
+    project_md_files = get_markdown_filenames(p=project_path, excluded_filenames=excluded_filenames)
+    print_list_with_numeric_options(title="projects", files_or_dirs=project_md_files)
+    llm_client = get_llm_client(cfg)
+    summaries = summary_store_from_config(cfg)
+
+    while True:
+        md_file_i = prompt_until_satisfied(
+            prompt_msg="Choose the file by its number",
+            input_prompt="> ",
+            msg_if_satisfied="Running LLM conversation regarding this project",
+            msg_if_not_satisfied="Wrong number. Try again",
+            condition=lambda i_as_str: 1 <= int(i_as_str) <= len(project_md_files),
+        )
+        md_file = project_md_files[int(md_file_i) - 1]
+
+        with open(project_path / md_file, "r") as f:
+            md_file_content = f.read()
+            context_packer = context_packer_from_config(md_file_content, cfg.context_packing, llm_client, summaries)
+            conversation = conversation_from_config(
+                md_file_content,
+                cfg.dialogue,
+                llm_client,
+                cfg.prompts.project_management,
+                context_packer=context_packer,
+            )
+            if conversation is not None:
+                dialogue_with_llm(
+                    llm_client=llm_client,
+                    conversation=conversation,
+                    stop_word=cfg.stop_word,
+                    stream=cfg.stream_llm_output,
+                )
+                continue
+
+            recurrent_non_dialogue_interaction_with_llm(
+                llm_client=llm_client,
+                system_prompt=cfg.prompts.project_management.system_prompt, 
+                user_prompt_prefix=cfg.prompts.project_management.user_prompt_prefix,
+                user_prompt_suffix=cfg.prompts.project_management.user_prompt_suffix,
+                user_prompt_extra_content=md_file_content,
+                stop_word=cfg.stop_word,
+                stream=cfg.stream_llm_output,
+                extra_content_first=cfg.prompt_cache.document_first,
+                pack_extra_content=context_packer.pack if context_packer is not None else None,
+            )
@@ -0,0 +1,61 @@
+import threading
+from typing import Any
+
+from omegaconf import DictConfig
+from rich.progress import Progress
+
+from llmass.utils.console import console
+
+from llmass.client import get_llm_client
+from llmass.modes.common import log_llm_client_stats, print_mode_title
+from llmass.papers import (
+    IncrementalMarkdownWriter,
+    SeenPaperStore,
+    format_paper_as_markdown,
+    run_recent_papers_pipeline,
+)
+
+
+def recent_papers(rss_feed_urls: list[str], output_filename: str, cfg: DictConfig) -> None:
+    print_mode_title(recent_papers.__name__)
+    llm_client = get_llm_client(cfg)
+    counters = {"queued": 0, "relevant": 0}
+    counters_lock = threading.Lock()
+    seen_paper_store = SeenPaperStore(
+        cfg.recent_papers.seen_papers_path,
+        reclassify_new_versions=cfg.recent_papers.reclassify_new_versions,
+    )
+    # Append to the output file so that re-running an interrupted run resumes it
+    with open(output_filename, "a") as f, Progress(console=console) as progress:
+        writer = IncrementalMarkdownWriter(f)
+        task = progress.add_task(f"Classifying papers from {len(rss_feed_urls)} RSS feeds", total=0)
+
+        def on_paper_queued(paper: dict[str, Any]) -> None:
+            with counters_lock:
+                counters["queued"] += 1
+                progress.update(task, total=counters["queued"])
+
+        def on_paper_classified(paper: dict[str, Any], relevant: bool) -> None:
+            if relevant:
+                writer.write(format_paper_as_markdown(paper))
+                with counters_lock:
+                    counters["relevant"] += 1
+            progress.advance(task)
+
+        run_recent_papers_pipeline(
+            rss_feed_urls=[rss_feed["url"] for rss_feed in rss_feed_urls],
+            llm_client=llm_client,
+            prompts=cfg.prompts.recent_papers,
+            batching=cfg.batch_classification,
+            n_workers=cfg.llm_client.max_concurrent_requests,
+            on_paper_queued=on_paper_queued,
+            on_paper_classified=on_paper_classified,
+            seen_paper_store=seen_paper_store,
+            decoding=cfg.classification,
+        )
+
+    console.print(
+        f"[green]{counters['queued']} new papers classified, "
+        f"{counters['relevant']} relevant ones saved to {output_filename}[/green]"
+    )
+    log_llm_client_stats(llm_client)
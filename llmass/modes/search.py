@@ -0,0 +1,60 @@
+from omegaconf import DictConfig
+from rich.panel import Panel
+from rich.text import Text
+
+from llmass.utils.console import console, prompt_user
+
+from llmass.client import get_llm_client
+from llmass.modes.common import log_llm_client_stats, print_list_with_numeric_options, print_mode_title
+from llmass.search import SearchableCollection
+from llmass.utils.common import prompt_until_satisfied
+
+
+def search(cfg: DictConfig) -> None:
+    print_mode_title(search.__name__)
+    llm_client = get_llm_client(cfg)
+    # First, let user choose the collection
+    collections = list(cfg.markdown_collections.keys())
+    print_list_with_numeric_options(
+        title="collections", 
+        files_or_dirs=[cfg.markdown_collections[name].path for name in collections],
+        names=[name for name in collections],
+        descriptions=[cfg.markdown_collections[name].description for name in collections],
+    )
+    
+    collection_i = prompt_until_satisfied(
+        prompt_msg="Choose collection to search in by its number",
+        input_prompt="> ",
+        msg_if_satisfied="Good choice, buddy!",
+        msg_if_not_satisfied="Wrong number. Try again",
+        condition=lambda i_as_str: 1 <= int(i_as_str) <= len(collections),
+    )
+    selected_collection = collections[int(collection_i) - 1]
+
+    # Get query from user
+    console.print("[green]Enter your search query:[/green]")
+    query = prompt_user()
+    
+    searchable_collection = SearchableCollection.from_config(selected_collection, cfg, llm_client)
+    results = searchable_collection.search(query)
+    if cfg.search.verify_with_llm:
+        log_llm_client_stats(llm_client)
+    
+    # Display results
+    if results:
+        console.print("\n[bold blue]Relevant sections found:[/bold blue]")
+        console.rule(style="blue")
+        
+        for result in results:
+            title = Text(f"📄 {result['file']} → {result['header']}", style="yellow bold")
+            content = Text(result['content'])
+            panel = Panel(
+                content,
+                title=title,
+                border_style="blue",
+                padding=(1, 2)
+            )
+            console.print(panel)
+            console.print()
+    else:
+        console.print("\n[bold red]No relevant content found.[/bold red]")
@@ -0,0 +1,86 @@
+from omegaconf import DictConfig
+
+from llmass.client import LlmClient, get_llm_client
+from llmass.curriculum import StudyCurriculum, StudyQuestionPool
+from llmass.interaction import single_message_non_dialogue_interaction_with_llm
+from llmass.modes.common import print_list_with_numeric_options, print_mode_title
+from llmass.utils.common import prompt_until_satisfied, print_llm_output
+from llmass.utils.console import console
+
+
+def study(study_path: str, cfg: DictConfig) -> None:
+    print_mode_title(study.__name__)
+    llm_client = get_llm_client(cfg)
+    question_pool = make_study_question_pool(cfg, llm_client)
+    curriculum = question_pool.curriculum
+    curriculum.refresh()
+
+    # Collect all the subjects in the study dir
+    subjects = curriculum.subjects()
+    print_list_with_numeric_options(title="study", files_or_dirs=subjects)
+
+    # Choose the subject
+    subject_i = prompt_until_satisfied(
+        prompt_msg="Choose the subject by its number",
+        input_prompt="> ",
+        msg_if_satisfied="Looking for the topics",
+        msg_if_not_satisfied="Wrong number. Try again",
+        condition=lambda i_as_str: 1 <= int(i_as_str) <= len(subjects),
+    )
+    subject = subjects[int(subject_i) - 1]
+
+    # Collect all the topics within the subject
+    topic_md_files = curriculum.topics(subject)
+    print_list_with_numeric_options(title=subject, files_or_dirs=topic_md_files)
+
+    # Choose the topic
+    topic_i = prompt_until_satisfied(
+        prompt_msg="Choose the topic by its number",
+        input_prompt="> ",
+        msg_if_satisfied="Generating a random question",
+        msg_if_not_satisfied="Wrong number. Try again",
+        condition=lambda i_as_str: 1 <= int(i_as_str) <= len(topic_md_files),
+    )
+    topic_md_file = topic_md_files[int(topic_i) - 1]
+
+    # Served from the pool if the server prepared questions for the topic. Nothing is prefetched here:
+    # the process exits right after the question, so it would either wait for the generations or drop them
+    try:
+        _, llm_output = question_pool.take(subject, topic_md_file, prefetch=False)
+        print_llm_output(llm_output)
+    except ValueError as e:
+        console.print(f"[bold red]{e}[/bold red]")
+
+
+def make_study_question_pool(cfg: DictConfig, llm_client: LlmClient) -> StudyQuestionPool:
+    curriculum = StudyCurriculum(
+        study_path=cfg.study_path,
+        index_path=cfg.study.curriculum_path,
+        schema=cfg.schemas.study,
+        max_review_interval_days=cfg.study.max_review_interval_days,
+    )
+    return StudyQuestionPool(
+        path=cfg.study.question_pool_path,
+        curriculum=curriculum,
+        generate_question=lambda subject, subtopic: generate_study_question(cfg, llm_client, subject, subtopic),
+        pool_size=cfg.study.question_pool_size,
+        max_workers=cfg.llm_client.max_concurrent_requests,
+    )
+
+
+def generate_study_question(
+    cfg: DictConfig,
+    llm_client: LlmClient,
+    subject: str,
+    subtopic: str,
+) -> str:
+    """Return a question about the subtopic of the subject generated by the LLM."""
+    return single_message_non_dialogue_interaction_with_llm(
+        llm_client=llm_client,
+        system_prompt=cfg.prompts.study.system_prompt, 
+        user_prompt_prefix=cfg.prompts.study.user_prompt_prefix,
+        user_prompt_question=cfg.prompts.study.user_prompt_question_at_startup,
+        user_prompt_suffix=cfg.prompts.study.user_prompt_suffix,
+        user_prompt_extra_content=f"Предмет: {subject}" + "\n" + f"Раздел: {subtopic}" + "\n",
+        use_cache=False,  # a new random question is expected every time
+    )
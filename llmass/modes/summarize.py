@@ -0,0 +1,31 @@
+from omegaconf import DictConfig
+
+from llmass.utils.console import console
+
+from llmass.client import get_llm_client
+from llmass.collection import MarkdownCollection
+from llmass.modes.common import log_llm_client_stats, print_mode_title
+from llmass.summaries import summarize_collection, summary_store_from_config
+
+
+def summarize(cfg: DictConfig) -> None:
+    print_mode_title(summarize.__name__)
+    summaries = summary_store_from_config(cfg)
+    if summaries is None:
+        console.print("[bold red]Summaries are disabled (summaries.enabled)[/bold red]")
+        return
+
+    llm_client = get_llm_client(cfg)
+    for name in cfg.markdown_collections:
+        n_sections, n_files = summarize_collection(
+            collection=MarkdownCollection.from_config(name, cfg),
+            store=summaries,
+            llm_client=llm_client,
+            prompts=cfg.prompts.summarize,
+            max_tokens=cfg.summaries.max_tokens,
+            max_workers=cfg.llm_client.max_concurrent_requests,
+            description=f"Summarizing {name}",
+        )
+        console.print(f"[green]{name}: {n_sections} new or modified sections and {n_files} files summarized[/green]")
+
+    log_llm_client_stats(llm_client)
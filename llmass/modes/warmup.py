@@ -0,0 +1,19 @@
+from omegaconf import DictConfig
+
+from llmass.client import get_llm_client
+from llmass.modes.common import print_mode_title, run_interaction_based_on_single_md_file
+
+
+def warmup(cfg: DictConfig) -> None:
+    print_mode_title(warmup.__name__)
+    run_interaction_based_on_single_md_file(
+        md_path=cfg.routine_path,
+        prompts=cfg.prompts.warmup,
+        llm_client=get_llm_client(cfg),
+        stop_word=cfg.stop_word,
+        ask_startup_question=True,
+        stream=cfg.stream_llm_output,
+        extra_content_first=cfg.prompt_cache.document_first,
+        context_packing=cfg.context_packing,
+        dialogue=cfg.dialogue,
+    )
@@ -0,0 +1,265 @@
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from pathlib import Path
+from typing import Any, Optional, TextIO
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import feedparser
+from omegaconf import DictConfig
+
+from llmass.classification import batch_token_budget, classify_batch, estimate_batch_item_n_tokens
+from llmass.client import LlmClient
+
+
+ARXIV_ID_PATTERN = re.compile(r"(\d{4}\.\d{4,5})(?:v(\d+))?")
+
+
+def fetch_feed(url: str) -> feedparser.FeedParserDict:
+    """Download and parse an RSS feed. file:// URLs are read from the local disk (e.g., test fixtures)."""
+    if url.startswith("file://"):
+        feed = feedparser.parse(url2pathname(urlparse(url).path))
+    else:
+        feed = feedparser.parse(url)
+        if feed.get("status") != 200:
+            raise ValueError(f"Cannot get RSS feed {url}, code: {feed.get('status')}")
+
+    if feed.bozo and not feed.entries:
+        raise ValueError(f"Cannot parse RSS feed {url}: {feed.bozo_exception}")
+
+    return feed
+
+
+def paper_from_feed_entry(entry: feedparser.FeedParserDict) -> dict[str, Any]:
+    arxiv_id, version = parse_arxiv_id(entry)
+    return {
+        "arxiv_id": arxiv_id,
+        "version": version,
+        "title": entry.title,
+        "link": entry.link,
+        "abstract": entry.description.split("\n")[1][10:],
+    }
+
+
+def parse_arxiv_id(entry: feedparser.FeedParserDict) -> tuple[str, Optional[int]]:
+    """Return arXiv ID and version of a feed entry, fall back to the title if there is no ID."""
+    for s in (entry.get("id", ""), entry.get("link", "")):
+        m = ARXIV_ID_PATTERN.search(s)
+        if m:
+            return m.group(1), int(m.group(2)) if m.group(2) else None
+
+    return entry.title, None
+
+
+def format_paper_as_markdown(paper: dict[str, Any]) -> str:
+    return (
+        f"### {paper['title']}"
+        "\n\n"
+        f"**Link:** {paper['link']}"
+        "\n\n"
+        f"**Abstract:** {paper['abstract']}"
+        "\n\n"
+    )
+
+
+def paper_as_classification_item(paper: dict[str, Any]) -> str:
+    return f"Title: {paper['title']}" + "\n" + f"Abstract: {paper['abstract']}" + "\n"
+
+
+class PaperQueue:
+    """Queue of papers to classify which drops the papers already put into it (keyed by arXiv ID).
+
+    Papers taken but not used (e.g., not fitting into a batch) are put back at
+    the front, ahead of the None markers queued by close for the consumers.
+    """
+    def __init__(self) -> None:
+        self._items: deque = deque()
+        self._seen: set[str] = set()
+        self._cond = threading.Condition()
+
+    def put(self, paper: dict[str, Any]) -> bool:
+        with self._cond:
+            if paper["arxiv_id"] in self._seen:
+                return False
+            self._seen.add(paper["arxiv_id"])
+            self._items.append(paper)
+            self._cond.notify()
+        return True
+
+    def close(self, n_consumers: int) -> None:
+        with self._cond:
+            self._items.extend([None] * n_consumers)
+            self._cond.notify_all()
+
+    def get(self, block: bool = True) -> Optional[dict[str, Any]]:
+        with self._cond:
+            if not block and not self._items:
+                raise queue.Empty
+            self._cond.wait_for(lambda: self._items)
+            return self._items.popleft()
+
+    def unget(self, paper: Optional[dict[str, Any]]) -> None:
+        with self._cond:
+            self._items.appendleft(paper)
+            self._cond.notify()
+
+
+class SeenPaperStore:
+    """Persistent store of the verdicts given to arXiv papers.
+
+    Verdicts are committed one by one so that an interrupted run can be resumed
+    without re-classifying anything. Verdicts are bound to the classification
+    question: changing the question makes all the papers unseen again.
+    """
+    def __init__(self, path: str, reclassify_new_versions: bool = False) -> None:
+        self.reclassify_new_versions = reclassify_new_versions
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS papers ("
+                "arxiv_id TEXT NOT NULL, question_sha256 TEXT NOT NULL, version INTEGER, "
+                "relevant INTEGER NOT NULL, title TEXT NOT NULL, decided_at REAL NOT NULL, "
+                "PRIMARY KEY (arxiv_id, question_sha256))"
+            )
+
+    def is_judged(self, paper: dict[str, Any], question: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM papers WHERE arxiv_id = ? AND question_sha256 = ?",
+                (paper["arxiv_id"], _sha256(question)),
+            ).fetchone()
+        if row is None:
+            return False
+
+        if self.reclassify_new_versions and paper["version"] is not None:
+            return row[0] is not None and row[0] >= paper["version"]
+
+        return True
+
+    def record(self, paper: dict[str, Any], question: str, relevant: bool) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO papers "
+                "(arxiv_id, question_sha256, version, relevant, title, decided_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (paper["arxiv_id"], _sha256(question), paper["version"], int(relevant), paper["title"], time.time()),
+            )
+
+
+class IncrementalMarkdownWriter:
+    """Appends markdown blocks to a file as soon as they are available."""
+    def __init__(self, f: TextIO) -> None:
+        self.f = f
+        self._lock = threading.Lock()
+
+    def write(self, md_block: str) -> None:
+        with self._lock:
+            self.f.write(md_block)
+            self.f.flush()
+
+
+def run_recent_papers_pipeline(
+    rss_feed_urls: Iterable[str],
+    llm_client: LlmClient,
+    prompts: DictConfig,
+    batching: DictConfig,
+    n_workers: int,
+    on_paper_queued: Callable[[dict[str, Any]], None],
+    on_paper_classified: Callable[[dict[str, Any], bool], None],
+    seen_paper_store: Optional[SeenPaperStore] = None,
+    decoding: Optional[DictConfig] = None,
+) -> None:
+    """Fetch the feeds concurrently and classify their papers while the feeds are still being fetched.
+
+    Papers already judged according to seen_paper_store are skipped, new verdicts
+    are recorded there right after on_paper_classified returns. Callbacks are
+    called from the worker threads. The probability of the paper being relevant
+    according to the LLM is stored in its "relevance" field before the callback.
+    """
+    rss_feed_urls = list(rss_feed_urls)
+    paper_queue = PaperQueue()
+    question = prompts.user_prompt_question_at_startup
+
+    def produce(url: str) -> None:
+        for entry in fetch_feed(url).entries:
+            paper = paper_from_feed_entry(entry)
+            if seen_paper_store is not None and seen_paper_store.is_judged(paper, question):
+                continue
+            if paper_queue.put(paper):
+                on_paper_queued(paper)
+
+    def consume() -> None:
+        while True:
+            paper = paper_queue.get()
+            if paper is None:
+                return
+
+            batch = [paper]
+            if batching.enabled:
+                batch = _take_batch(paper_queue, batch, batching, prompts, question)
+            items = [paper_as_classification_item(p) for p in batch]
+            for p, probability in zip(batch, classify_batch(llm_client, prompts, question, items, decoding)):
+                p["relevance"] = probability
+                relevant = probability >= 0.5
+                on_paper_classified(p, relevant)
+                if seen_paper_store is not None:
+                    seen_paper_store.record(p, question, relevant)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(rss_feed_urls))) as producers, \
+         ThreadPoolExecutor(max_workers=max(1, n_workers)) as consumers:
+        consumer_futures = [
+            consumers.submit(contextvars.copy_context().run, consume) for _ in range(max(1, n_workers))
+        ]
+        producer_futures = [producers.submit(produce, url) for url in rss_feed_urls]
+        try:
+            for future in producer_futures:
+                future.result()
+        finally:
+            paper_queue.close(len(consumer_futures))
+
+        for future in consumer_futures:
+            future.result()
+
+
+def _take_batch(
+    paper_queue: PaperQueue,
+    batch: list[dict[str, Any]],
+    batching: DictConfig,
+    prompts: DictConfig,
+    question: str,
+) -> list[dict[str, Any]]:
+    """Add the papers already waiting in the queue to the batch as long as they fit in."""
+    token_budget = batch_token_budget(prompts, question, batching)
+    n_tokens = estimate_batch_item_n_tokens(0, paper_as_classification_item(batch[0]))
+    while len(batch) < batching.max_batch_size:
+        try:
+            paper = paper_queue.get(block=False)
+        except queue.Empty:
+            break
+
+        if paper is None:  # let the consumer finish after the current batch
+            paper_queue.unget(paper)
+            break
+
+        paper_n_tokens = estimate_batch_item_n_tokens(len(batch), paper_as_classification_item(paper))
+        if n_tokens + paper_n_tokens > token_budget:
+            paper_queue.unget(paper)
+            break
+
+        batch.append(paper)
+        n_tokens += paper_n_tokens
+
+    return batch
+
+
+def _sha256(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
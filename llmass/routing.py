@@ -0,0 +1,212 @@
+"""Routing of the chat requests across several LLM servers.
+
+llm_server_url is either a single URL or a list of backends, each given as a
+URL or as a mapping with the url, an optional weight and optional roles:
+
+    llm_server_url:
+      - url: http://localhost:9191/v1/chat/completions
+        weight: 2
+      - url: http://localhost:9192/v1/chat/completions
+        roles: [classification]
+
+Every request goes to the backend with the fewest requests in flight per unit
+of weight among the healthy ones serving its role ("classification" for the
+yes/no prompts, "summarization" for the summarize mode, "interactive" for the
+answers shown to the user; a backend without roles serves all of them). A
+backend failing eject_after_failures requests in a row (connection errors,
+timeouts and 5xx responses once the retries are exhausted) gets no requests
+until its health check passes, or for eject_s seconds if there is no health
+check.
+"""
+from collections.abc import Callable, Collection, Sequence
+from dataclasses import dataclass
+import logging
+import math
+import threading
+import time
+from typing import Any, Optional, Union
+from urllib.parse import urljoin
+
+import requests
+from omegaconf import DictConfig, ListConfig
+
+
+LOGGER = logging.getLogger(__name__)
+ROLES = ("classification", "interactive", "summarization")
+
+
+@dataclass
+class Backend:
+    url: str
+    weight: float = 1.0
+    roles: tuple[str, ...] = ()  # empty to serve all the roles
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+
+    def serves(self, role: str) -> bool:
+        return not self.roles or role in self.roles
+
+    def is_healthy(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+
+def parse_backends(spec: Union[str, Sequence[Any]]) -> list[Backend]:
+    """Return the backends given by llm_server_url, see the module docstring for the format."""
+    if isinstance(spec, str):
+        return [Backend(url=spec)]
+
+    backends = []
+    for item in spec:
+        if isinstance(item, str):
+            backends.append(Backend(url=item))
+            continue
+
+        roles = tuple(item.get("roles") or ())
+        unknown_roles = set(roles) - set(ROLES)
+        if unknown_roles:
+            raise ValueError(f"Unknown roles of the LLM backend {item['url']}: {sorted(unknown_roles)}")
+        weight = float(item.get("weight", 1.0))
+        if weight <= 0:
+            raise ValueError(f"Weight of the LLM backend {item['url']} must be positive")
+        backends.append(Backend(url=item["url"], weight=weight, roles=roles))
+
+    if not backends:
+        raise ValueError("At least one LLM backend is required")
+    return backends
+
+
+def is_backend_failure(e: BaseException) -> bool:
+    """Return whether the error says something about the backend rather than about the request."""
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code >= 500
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
+
+
+class BackendPool:
+    """Thread-safe least-outstanding-requests balancer over the backends."""
+    def __init__(
+        self,
+        backends: list[Backend],
+        eject_after_failures: int = 3,
+        eject_s: float = 30.0,
+        health_check: Optional[Callable[[Backend], bool]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.backends = backends
+        self.eject_after_failures = eject_after_failures
+        self.eject_s = eject_s
+        self.health_check = health_check
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._health_checker: Optional[threading.Thread] = None
+
+    def cache_namespace(self, role: str) -> str:
+        """Return what the response cache keys of the role depend on instead of the URL of a single server."""
+        return " ".join(sorted(backend.url for backend in self._candidates(role)))
+
+    def acquire(self, role: str, exclude: Collection[str] = ()) -> Backend:
+        """Return the backend to send the next request of the role to and count the request as outstanding.
+
+        Ejected backends are used only when no healthy one serving the role is
+        left, the one coming back soonest first. Every acquire must be followed
+        by a release.
+        """
+        with self._lock:
+            now = self.clock()
+            candidates = [backend for backend in self._candidates(role) if backend.url not in exclude]
+            if not candidates:
+                raise ValueError(f"No LLM backend left for {role} requests")
+
+            healthy = [backend for backend in candidates if backend.is_healthy(now)]
+            if healthy:
+                backend = min(healthy, key=lambda b: (b.outstanding + 1) / b.weight)
+            else:
+                backend = min(candidates, key=lambda b: b.ejected_until)
+            backend.outstanding += 1
+            return backend
+
+    def release(self, backend: Backend, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            if error is None or not is_backend_failure(error):
+                backend.consecutive_failures = 0
+                return
+
+            backend.consecutive_failures += 1
+            # With a single backend there is nothing to route around
+            if len(self.backends) > 1 and backend.consecutive_failures >= self.eject_after_failures:
+                self._eject(backend)
+
+    def has_alternative(self, role: str, exclude: Collection[str]) -> bool:
+        """Return whether a healthy backend serving the role is left outside exclude."""
+        with self._lock:
+            now = self.clock()
+            return any(
+                backend.url not in exclude and backend.is_healthy(now) for backend in self._candidates(role)
+            )
+
+    def _candidates(self, role: str) -> list[Backend]:
+        # A role none of the backends is dedicated to is served by all of them
+        return [backend for backend in self.backends if backend.serves(role)] or self.backends
+
+    def _eject(self, backend: Backend) -> None:
+        if not backend.is_healthy(self.clock()):
+            return
+
+        LOGGER.warning(
+            f"LLM backend {backend.url} failed {backend.consecutive_failures} requests in a row, ejecting it"
+        )
+        if self.health_check is None:
+            # Back after eject_s, ejected again by the first failure if it is still down
+            backend.ejected_until = self.clock() + self.eject_s
+            backend.consecutive_failures = self.eject_after_failures - 1
+            return
+
+        backend.ejected_until = math.inf  # until the health check passes
+        if self._health_checker is None:
+            self._health_checker = threading.Thread(target=self._check_ejected_backends, daemon=True)
+            self._health_checker.start()
+
+    def check_ejected_backends(self) -> None:
+        """Bring back the ejected backends passing the health check."""
+        with self._lock:
+            ejected = [backend for backend in self.backends if backend.ejected_until == math.inf]
+        for backend in ejected:
+            try:
+                healthy = self.health_check(backend)
+            except Exception:
+                healthy = False
+            if healthy:
+                LOGGER.warning(f"LLM backend {backend.url} passed the health check, sending requests to it again")
+                with self._lock:
+                    backend.ejected_until = 0.0
+                    backend.consecutive_failures = 0
+
+    def _check_ejected_backends(self) -> None:
+        while True:
+            time.sleep(self.eject_s)
+            with self._lock:
+                if not any(backend.ejected_until == math.inf for backend in self.backends):
+                    self._health_checker = None  # under the lock for _eject to start a new one if needed
+                    return
+
+            self.check_ejected_backends()
+
+
+def backend_pool_from_config(
+    llm_server_url: Union[str, ListConfig],
+    cfg: DictConfig,
+    timeout: float,
+) -> BackendPool:
+    health_check_path = cfg.health_check_path
+
+    def check_health(backend: Backend) -> bool:
+        return requests.get(urljoin(backend.url, health_check_path), timeout=timeout).ok
+
+    return BackendPool(
+        parse_backends(llm_server_url),
+        eject_after_failures=cfg.eject_after_failures,
+        eject_s=cfg.eject_s,
+        health_check=check_health if health_check_path is not None else None,
+    )
@@ -1,27 +1,145 @@
+"""Entry point of the assistant.
+
+Composing the config with Hydra costs a quarter of a second in imports alone,
+which dominates the startup of the interactive modes. The composed (still
+unresolved) config is therefore cached under a fingerprint of the config files
+and of the command line overrides. When the fingerprint matches, the cached
+config is loaded with plain OmegaConf and the mode is dispatched without
+importing Hydra at all. Anything Hydra-specific on the command line (flags like
+--multirun or --cfg, hydra.* overrides) always goes through Hydra.
+"""
+from datetime import datetime
+import hashlib
+import importlib
 import logging
+import logging.config
+import os
 from pathlib import Path
+import sys
+from typing import Optional
 
-import hydra
-from hydra.utils import instantiate 
-from omegaconf import DictConfig
+from omegaconf import DictConfig, OmegaConf
 
-from llmass.modes import warmup, projects
 from llmass.utils.common import get_config_path
 
 
 CONFIG_NAME = "config_llm_runner"
+JOB_NAME = "llm_runner"  # the name Hydra gives to the job, used for the log file name
+COMPOSED_CONFIG_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "llmass" / "composed_configs"
+NO_CONFIG_CACHE_ENV_VAR = "LLMASS_NO_CONFIG_CACHE"
 LOGGER = logging.getLogger(__name__)
 logging.getLogger("requests").setLevel(logging.WARNING)
 
 
 def llm_runner(cfg: DictConfig) -> None:
-    instantiate(cfg.mode)(cfg)
-    
+    try:
+        run_mode(cfg)
+    finally:
+        from llmass.telemetry import active_telemetry  # already imported by the mode if it made LLM calls
+
+        telemetry = active_telemetry()
+        if telemetry is not None:
+            telemetry.close()
+            if cfg.telemetry.print_summary:
+                telemetry.print_summary()
+
+
+def run_mode(cfg: DictConfig) -> None:
+    """Import the mode function named by ``cfg.mode._target_`` and call it.
+
+    Equivalent to ``instantiate(cfg.mode)(cfg)`` for the partial mode configs
+    in config/mode, but only the module of the selected mode is imported.
+    """
+    module_name, _, func_name = cfg.mode._target_.rpartition(".")
+    mode_func = getattr(importlib.import_module(module_name), func_name)
+    from llmass.telemetry import telemetry_mode  # off the startup path until the mode is resolved
+
+    with telemetry_mode(func_name):
+        mode_func(*cfg.mode.get("_args_", []), cfg)
+
+
+def load_cached_config(overrides: list[str]) -> Optional[DictConfig]:
+    if not _can_use_cached_config(overrides):
+        return None
+
+    path = _cached_config_path(overrides)
+    if not path.exists():
+        return None
+
+    return OmegaConf.load(path)
+
+
+def cache_composed_config(cfg: DictConfig, overrides: list[str]) -> None:
+    if not _can_use_cached_config(overrides):
+        return
+
+    path = _cached_config_path(overrides)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    OmegaConf.save(cfg, tmp_path)  # interpolations such as ${now:...} are kept unresolved
+    os.replace(tmp_path, path)
+
+
+def prepare_run_dir(cfg: DictConfig, overrides: list[str]) -> None:
+    """Do what Hydra does before running the job: create the run dir, save the config there and set up logging."""
+    run_dir = Path(cfg.hydra_dir)
+    hydra_output_dir = run_dir / ".hydra"
+    hydra_output_dir.mkdir(parents=True, exist_ok=True)
+    OmegaConf.save(cfg, hydra_output_dir / "config.yaml")
+    OmegaConf.save(OmegaConf.create(overrides), hydra_output_dir / "overrides.yaml")
+
+    job_logging = OmegaConf.load(get_config_path() / "hydra" / "job_logging" / "base.yaml")
+    job_logging.handlers.file.filename = str(run_dir / f"{JOB_NAME}.log")
+    logging.config.dictConfig(OmegaConf.to_container(job_logging, resolve=True))
+
+
+def _can_use_cached_config(overrides: list[str]) -> bool:
+    if os.environ.get(NO_CONFIG_CACHE_ENV_VAR):
+        return False
+
+    for override in overrides:
+        key = override.split("=", 1)[0].lstrip("+~")
+        if override.startswith("-") or "=" not in override or key.startswith("hydra"):
+            return False
+
+    return True
+
+
+def _cached_config_path(overrides: list[str]) -> Path:
+    config_path = get_config_path()
+    h = hashlib.sha256()
+    h.update(CONFIG_NAME.encode())
+    for override in overrides:
+        h.update(b"\0" + override.encode())
+    for config_file in sorted(config_path.rglob("*.yaml")):
+        stat = config_file.stat()
+        h.update(f"\0{config_file.relative_to(config_path)}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return COMPOSED_CONFIG_CACHE_DIR / f"{h.hexdigest()}.yaml"
+
+
+def _main() -> None:
+    overrides = sys.argv[1:]
+    cfg = load_cached_config(overrides)
+    if cfg is not None:
+        # The same resolver Hydra registers, cached so that all the ${now:...} agree within the run
+        if not OmegaConf.has_resolver("now"):
+            OmegaConf.register_new_resolver("now", lambda pattern: datetime.now().strftime(pattern), use_cache=True)
+        prepare_run_dir(cfg, overrides)
+        llm_runner(cfg)
+        return
+
+    import hydra
+
+    def llm_runner_caching_config(cfg: DictConfig) -> None:
+        cache_composed_config(cfg, overrides)
+        llm_runner(cfg)
 
-if __name__ == "__main__":
     hydra.main(
         config_path=str(get_config_path()),
         config_name=CONFIG_NAME,
         version_base="1.3",
-    )(llm_runner)()
+    )(llm_runner_caching_config)()
+
 
+if __name__ == "__main__":
+    _main()
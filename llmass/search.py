@@ -0,0 +1,199 @@
+from collections.abc import Iterable
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+from omegaconf import DictConfig
+
+from llmass.classification import classify_items
+from llmass.client import LlmClient
+from llmass.collection import CollectionChanges, CollectionSections, MarkdownCollection
+from llmass.embedding_index import EmbeddingIndex
+from llmass.lexical_index import LexicalIndex
+from llmass.summaries import SummaryStore, summary_store_from_config
+from llmass.watcher import CollectionWatcher
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SearchableCollection:
+    """Markdown collection together with the index ranking its sections against a query.
+
+    It is safe to share an instance between threads: refreshing the collection
+    and its index is serialized while the LLM verification of the candidates
+    of different queries runs concurrently.
+
+    A watched collection is updated in the background after every burst of
+    saves and a query only re-parses the files touched since the last update
+    instead of checking all of them.
+    """
+    def __init__(
+        self,
+        name: str,
+        collection: MarkdownCollection,
+        index: Optional[Union[EmbeddingIndex, LexicalIndex]],
+        llm_client: LlmClient,
+        cfg: DictConfig,
+        summaries: Optional[SummaryStore] = None,
+    ) -> None:
+        self.name = name
+        self.collection = collection
+        self.index = index
+        self.llm_client = llm_client
+        self.cfg = cfg
+        self.summaries = summaries
+        self._sections: Optional[CollectionSections] = None
+        self._index_stale = False  # the last index update failed, the manifest is ahead of the index
+        self._watcher: Optional[CollectionWatcher] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, name: str, cfg: DictConfig, llm_client: LlmClient) -> "SearchableCollection":
+        collection = MarkdownCollection.from_config(name, cfg)
+        if cfg.search.ranker is None:
+            index = None
+        elif cfg.search.ranker == "embeddings":
+            index = EmbeddingIndex(Path(cfg.cache_dir) / "embeddings" / name)
+        elif cfg.search.ranker == "bm25":
+            index = LexicalIndex(Path(cfg.cache_dir) / "lexical" / f"{name}.sqlite")
+        else:
+            raise ValueError(f"Unknown search ranker: {cfg.search.ranker}")
+
+        return cls(name, collection, index, llm_client, cfg, summary_store_from_config(cfg))
+
+    def refresh(self) -> CollectionChanges:
+        """Re-parse the changed files (only changed files are re-parsed) and update the index."""
+        with self._lock:
+            return self._refresh()
+
+    def watch(self, debounce_s: float = 1.0, poll_interval_s: float = 2.0) -> None:
+        """Start updating the collection and its index as soon as its files change, see CollectionWatcher."""
+        if self._watcher is not None:
+            return
+
+        watcher = CollectionWatcher(
+            self.collection.root,
+            on_change=lambda: self._refresh_touched(watcher),
+            debounce_s=debounce_s,
+            poll_interval_s=poll_interval_s,
+            excluded_filenames=self.collection.excluded_filenames,
+        )
+        watcher.start()
+        self._watcher = watcher
+
+    def close(self) -> None:
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def candidates(self, query: str) -> list[dict[str, str]]:
+        """Return the sections most likely to be relevant to the query, best first."""
+        query_vector = None
+        if isinstance(self.index, EmbeddingIndex):
+            # Outside the lock so that the queries wait for each other only to refresh and rank
+            query_vector = self.llm_client.embed([query])[0]
+
+        with self._lock:
+            if self._watcher is not None and self._sections is not None:
+                self._refresh_pending(self._watcher)
+            else:
+                self._refresh()
+            sections = self._sections
+            if self.index is None:
+                return sections.get_many(range(len(sections)))
+
+            if query_vector is not None:
+                # Narrow the search down to the sections closest to the query in the embedding space
+                top_hashes = [
+                    section["sha256"] for section, _ in self.index.top_k(query_vector, k=self.cfg.search.top_k)
+                ]
+            else:
+                # Narrow the search down to the sections sharing terms with the query (no LLM calls at all)
+                top_hashes = [sha256 for sha256, _ in self.index.top_k(query, k=self.cfg.search.top_k)]
+
+            section_ids = {h: i for i, h in enumerate(sections.hashes)}
+            # An index behind the sections (e.g., being rebuilt) may rank sections that are gone
+            return sections.get_many(section_ids[h] for h in top_hashes if h in section_ids)
+
+    def search(
+        self,
+        query: str,
+        verify_with_llm: Optional[bool] = None,
+        show_progress: bool = True,
+    ) -> list[dict[str, str]]:
+        """Return the sections relevant to the query.
+
+        The ranked candidates are verified by the LLM unless verify_with_llm
+        is False (defaults to search.verify_with_llm). Verified sections are
+        ordered by the probability of the LLM answering yes, the ranker order
+        breaking the ties (e.g., if the server reports no logprobs). Sections
+        summarized by the summarize mode are verified against their summaries.
+        """
+        candidates = self.candidates(query)
+        if verify_with_llm is None:
+            verify_with_llm = self.cfg.search.verify_with_llm
+        if not verify_with_llm:
+            return candidates
+
+        probabilities = classify_items(
+            llm_client=self.llm_client,
+            prompts=self.cfg.prompts.search,
+            question=query,
+            items=[self._verification_text(section) for section in candidates],
+            batching=self.cfg.batch_classification,
+            max_workers=self.cfg.llm_client.max_concurrent_requests,
+            description="Verifying candidate sections" if show_progress else None,
+            decoding=self.cfg.classification,
+        )
+        relevant = [i for i, probability in enumerate(probabilities) if probability >= 0.5]
+        relevant.sort(key=lambda i: -probabilities[i])  # stable, so equally probable ones stay in the ranker order
+        return [candidates[i] for i in relevant]
+
+    def _verification_text(self, section: dict[str, str]) -> str:
+        text = f"{section['header']}\n\n{section['content']}"
+        summary = self.summaries.get("section", text) if self.summaries is not None else None
+        return f"{section['header']}\n\n{summary}" if summary is not None else text
+
+    def _refresh_touched(self, watcher: CollectionWatcher) -> None:
+        with self._lock:
+            if self._sections is not None:
+                self._refresh_pending(watcher)
+            else:  # the first query scans the whole collection anyway
+                watcher.take_pending()
+
+    def _refresh_pending(self, watcher: CollectionWatcher) -> None:
+        rel_paths = watcher.take_pending()
+        try:
+            self._refresh(rel_paths)
+        except Exception:
+            # Back to the watcher to be retried after the debounce period or by the next query
+            watcher.record(rel_paths or set(), rescan=rel_paths is None)
+            raise
+
+    def _refresh(self, rel_paths: Optional[Iterable[str]] = None) -> CollectionChanges:
+        changes = self.collection.refresh(rel_paths)
+        if changes:
+            LOGGER.info(
+                f"Collection {self.name} updated: {len(changes.added)} added, "
+                f"{len(changes.modified)} modified, {len(changes.deleted)} deleted files"
+            )
+
+        # The changes are in the manifest as soon as the collection is refreshed, so an index update
+        # that fails (e.g., the embedding server is down) is retried by the next refresh
+        if changes or self._sections is None or self._index_stale:
+            self._index_stale = True
+            self._sections = self.collection.sections()
+            n_indexed = 0
+            if isinstance(self.index, EmbeddingIndex):
+                n_indexed = self.index.update(
+                    self._sections, embed=self.llm_client.embed, batch_size=self.cfg.search.embedding_batch_size
+                )
+            elif isinstance(self.index, LexicalIndex):
+                n_indexed = self.index.update(self._sections)
+            self._index_stale = False
+            if n_indexed:
+                LOGGER.info(f"Indexed {n_indexed} new or modified sections of collection {self.name}")
+
+        return changes
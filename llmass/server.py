@@ -0,0 +1,253 @@
+import contextvars
+import json
+import logging
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from omegaconf import DictConfig, OmegaConf
+
+from llmass.client import get_llm_client
+from llmass.context_packing import context_packer_from_config
+from llmass.interaction import single_message_non_dialogue_interaction_with_llm
+from llmass.modes.study import make_study_question_pool
+from llmass.papers import format_paper_as_markdown, run_recent_papers_pipeline
+from llmass.search import SearchableCollection
+from llmass.collection import MarkdownCollection
+from llmass.summaries import summarize_collection, summary_store_from_config
+from llmass.telemetry import telemetry_mode
+from llmass.utils.console import console
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class AssistantServer(ThreadingHTTPServer):
+    """Local HTTP server exposing the modes as JSON endpoints.
+
+    The config is composed once at startup and the LLM client (with its
+    connection pool) as well as the parsed and indexed collections stay warm
+    between requests. Requests are served concurrently, one thread per request.
+    With server.watch_collections, the collections are re-indexed as soon as
+    their files are saved.
+    """
+    daemon_threads = True
+
+    def __init__(self, cfg: DictConfig) -> None:
+        self.cfg = cfg
+        self.llm_client = get_llm_client(cfg)
+        self.study_questions = make_study_question_pool(cfg, self.llm_client)
+        self.summaries = summary_store_from_config(cfg)
+        self._collections: dict[str, SearchableCollection] = {}
+        self._collections_lock = threading.Lock()
+        super().__init__((cfg.server.host, cfg.server.port), RequestHandler)
+
+    def collection(self, name: str) -> SearchableCollection:
+        if name not in self.cfg.markdown_collections:
+            raise BadRequest(f"Unknown collection: {name}")
+
+        with self._collections_lock:
+            if name not in self._collections:
+                collection = SearchableCollection.from_config(name, self.cfg, self.llm_client)
+                if self.cfg.server.watch_collections:
+                    collection.watch(
+                        debounce_s=self.cfg.collections.watch_debounce_s,
+                        poll_interval_s=self.cfg.collections.watch_poll_interval_s,
+                    )
+                self._collections[name] = collection
+            return self._collections[name]
+
+    def server_close(self) -> None:
+        super().server_close()
+        with self._collections_lock:
+            for collection in self._collections.values():
+                collection.close()
+
+    def summarize_collections(self) -> None:
+        """Summarize what is new in all the collections, the summaries are used as soon as they are stored."""
+        for name in self.cfg.markdown_collections:
+            try:
+                n_sections, n_files = summarize_collection(
+                    collection=MarkdownCollection.from_config(name, self.cfg),
+                    store=self.summaries,
+                    llm_client=self.llm_client,
+                    prompts=self.cfg.prompts.summarize,
+                    max_tokens=self.cfg.summaries.max_tokens,
+                    max_workers=self.cfg.llm_client.max_concurrent_requests,
+                )
+            except Exception:
+                LOGGER.exception(f"Cannot summarize collection {name}")
+                continue
+            LOGGER.info(f"Summarized {n_sections} sections and {n_files} files of collection {name}")
+
+    def search(self, request: dict[str, Any]) -> dict[str, Any]:
+        collection = self.collection(_require(request, "collection"))
+        results = collection.search(
+            _require(request, "query"),
+            verify_with_llm=request.get("verify_with_llm"),
+            show_progress=False,
+        )
+        return {"results": [_without_hash(section) for section in results]}
+
+    def study(self, request: dict[str, Any]) -> dict[str, Any]:
+        subject = _require(request, "subject")
+        topic = _require(request, "topic")
+        _resolve_inside(Path(self.cfg.study_path), subject, topic)
+        try:
+            subtopic, question = self.study_questions.take(subject, topic)
+        except ValueError as e:  # no non-empty topics
+            raise BadRequest(str(e)) from e
+        return {"subject": subject, "topic": topic, "subtopic": subtopic, "question": question}
+
+    def projects(self, request: dict[str, Any]) -> dict[str, Any]:
+        md_path = _resolve_inside(Path(self.cfg.student_project_path), _require(request, "project"))
+        prompts = self.cfg.prompts.project_management
+        question = _require(request, "question")
+        md_file_content = md_path.read_text()
+        context_packer = context_packer_from_config(
+            md_file_content, self.cfg.context_packing, self.llm_client, self.summaries
+        )
+        answer = single_message_non_dialogue_interaction_with_llm(
+            llm_client=self.llm_client,
+            system_prompt=prompts.system_prompt,
+            user_prompt_prefix=prompts.user_prompt_prefix,
+            user_prompt_question=question,
+            user_prompt_suffix=prompts.user_prompt_suffix,
+            user_prompt_extra_content=(
+                context_packer.pack(question) if context_packer is not None else md_file_content
+            ),
+            extra_content_first=self.cfg.prompt_cache.document_first,
+        )
+        return {"answer": answer}
+
+    def recent_papers(self, request: dict[str, Any]) -> dict[str, Any]:
+        rss_feeds = request.get("rss_feeds") or OmegaConf.to_container(self.cfg.recent_papers.rss_feeds)
+        relevant_papers = []
+        lock = threading.Lock()
+
+        def on_paper_classified(paper: dict[str, Any], relevant: bool) -> None:
+            if relevant:
+                with lock:
+                    relevant_papers.append(paper)
+
+        run_recent_papers_pipeline(
+            rss_feed_urls=[rss_feed["url"] for rss_feed in rss_feeds],
+            llm_client=self.llm_client,
+            prompts=self.cfg.prompts.recent_papers,
+            batching=self.cfg.batch_classification,
+            n_workers=self.cfg.llm_client.max_concurrent_requests,
+            on_paper_queued=lambda paper: None,
+            on_paper_classified=on_paper_classified,
+            decoding=self.cfg.classification,
+        )
+        relevant_papers.sort(key=lambda paper: -paper["relevance"])
+        return {
+            "papers": relevant_papers,
+            "markdown": "".join(format_paper_as_markdown(paper) for paper in relevant_papers),
+        }
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server: AssistantServer
+    post_routes = {
+        "/search": "search",
+        "/study": "study",
+        "/projects": "projects",
+        "/recent_papers": "recent_papers",
+    }
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/metrics" and self.server.llm_client.telemetry is not None:
+            body = self.server.llm_client.telemetry.prometheus_text().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/collections":
+            self._send_json(HTTPStatus.OK, {
+                "collections": {
+                    name: collection.description
+                    for name, collection in self.server.cfg.markdown_collections.items()
+                },
+            })
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self) -> None:
+        route = self.post_routes.get(self.path)
+        if route is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint: {self.path}"})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(request, dict):
+                raise BadRequest("Request body must be a JSON object")
+            with telemetry_mode(f"serve{self.path}"):
+                response = getattr(self.server, route)(request)
+        except (BadRequest, json.JSONDecodeError) as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        except Exception as e:
+            LOGGER.exception(f"Request to {self.path} failed")
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+        else:
+            self._send_json(HTTPStatus.OK, response)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        LOGGER.info(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status: HTTPStatus, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(cfg: DictConfig) -> None:
+    server = AssistantServer(cfg)
+    if cfg.server.warm_up_collections:
+        for name in cfg.markdown_collections:
+            console.print(f"[dim]Warming up collection {name}[/dim]")
+            server.collection(name).refresh()
+
+    if cfg.server.summarize_in_background and server.summaries is not None:
+        with telemetry_mode("serve/summarize"):
+            context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(server.summarize_collections,), daemon=True).start()
+
+    console.print(f"[green]Serving on http://{cfg.server.host}:{cfg.server.port}[/green]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _require(request: dict[str, Any], key: str) -> Any:
+    if key not in request:
+        raise BadRequest(f"Missing field: {key}")
+    return request[key]
+
+
+def _resolve_inside(root: Path, *parts: str) -> Path:
+    """Join parts to root making sure the result does not escape root."""
+    path = root.joinpath(*parts).resolve()
+    if not path.is_relative_to(root.resolve()) or not path.is_file():
+        raise BadRequest(f"No such file: {'/'.join(parts)}")
+    return path
+
+
+def _without_hash(section: dict[str, str]) -> dict[str, str]:
+    return {k: v for k, v in section.items() if k != "sha256"}
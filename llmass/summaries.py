@@ -0,0 +1,163 @@
+"""Summaries of the sections and files of the markdown collections.
+
+The summarize mode asks the LLM for a short summary of every section of every
+collection, then for a summary of every file made of the summaries of its
+sections. Summaries are stored in SQLite under the hash of the summarized text
+and of the prompts, so only new or modified texts are summarized again and the
+same text is summarized once wherever it is read from (e.g., a project note is
+also a file of the management collection).
+
+search verifies the candidate sections against their summaries instead of
+their full text, and the context packing of projects sends the summaries of
+the sections it cannot fit in full.
+"""
+from collections import defaultdict
+import hashlib
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from omegaconf import DictConfig
+
+from llmass.classification import estimate_n_tokens
+from llmass.client import LlmClient
+from llmass.collection import MarkdownCollection
+from llmass.interaction import compose_messages
+from llmass.utils.concurrency import map_concurrently
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SummaryStore:
+    """Persistent store of the summaries of sections ("section") and whole files ("file").
+
+    Texts of at most min_tokens tokens are their own summaries and are not
+    stored. Changing the summarization prompts makes all the summaries missing.
+    """
+    def __init__(self, path: str, prompts: DictConfig, min_tokens: int = 150) -> None:
+        self.min_tokens = min_tokens
+        self._prompts_sha256 = _sha256(
+            "\0".join([prompts.system_prompt, prompts.section_user_prompt_prefix, prompts.file_user_prompt_prefix])
+        )
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, summary TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def needs_summary(self, text: str) -> bool:
+        return estimate_n_tokens(text) > self.min_tokens
+
+    def get(self, kind: str, text: str) -> Optional[str]:
+        if not self.needs_summary(text):
+            return text
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE key = ?", (self._key(kind, text),)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, kind: str, text: str, summary: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, kind, summary, created_at) VALUES (?, ?, ?, ?)",
+                (self._key(kind, text), kind, summary, time.time()),
+            )
+
+    def _key(self, kind: str, text: str) -> str:
+        return _sha256(f"{self._prompts_sha256}\0{kind}\0{text}")
+
+
+def summarize_collection(
+    collection: MarkdownCollection,
+    store: SummaryStore,
+    llm_client: LlmClient,
+    prompts: DictConfig,
+    max_tokens: Optional[int],
+    max_workers: int,
+    description: Optional[str] = None,
+) -> tuple[int, int]:
+    """Summarize the sections, then the files, missing from the store and return how many of each were summarized.
+
+    Every summary is stored as soon as it is ready, so an interrupted run
+    resumes where it stopped.
+    """
+    collection.refresh()
+    sections = collection.sections()
+    sections_by_file = defaultdict(list)
+    for i in range(len(sections)):
+        sections_by_file[sections.file(i)].append(i)
+
+    section_texts = [text for _, text in sections.iter_texts()]
+    missing_section_texts = sorted({text for text in section_texts if store.get("section", text) is None})
+
+    def summarize_section(text: str) -> None:
+        store.set("section", text, _summarize(llm_client, prompts, prompts.section_user_prompt_prefix, text, max_tokens))
+
+    map_concurrently(
+        summarize_section,
+        missing_section_texts,
+        max_workers=max_workers,
+        description=f"{description}: sections" if description is not None else None,
+    )
+
+    missing_files = []
+    for rel_path in sorted(collection.files):
+        file_text = (collection.root / rel_path).read_text()
+        if store.get("file", file_text) is not None:
+            continue
+
+        # Files are summarized from the summaries of their sections, not from their full text
+        digest = "\n\n".join(
+            f"{sections.headers[i]}\n{store.get('section', section_texts[i])}" for i in sections_by_file[rel_path]
+        )
+        missing_files.append((file_text, f"File: {rel_path}\n\n{digest or file_text}"))
+
+    def summarize_file(file: tuple[str, str]) -> None:
+        file_text, digest = file
+        store.set("file", file_text, _summarize(llm_client, prompts, prompts.file_user_prompt_prefix, digest, max_tokens))
+
+    map_concurrently(
+        summarize_file,
+        missing_files,
+        max_workers=max_workers,
+        description=f"{description}: files" if description is not None else None,
+    )
+    return len(missing_section_texts), len(missing_files)
+
+
+def summary_store_from_config(cfg: DictConfig) -> Optional[SummaryStore]:
+    if not cfg.summaries.enabled:
+        return None
+
+    return SummaryStore(cfg.summaries.path, cfg.prompts.summarize, min_tokens=cfg.summaries.min_tokens)
+
+
+def _summarize(
+    llm_client: LlmClient,
+    prompts: DictConfig,
+    user_prompt_prefix: str,
+    text: str,
+    max_tokens: Optional[int],
+) -> str:
+    params = {"max_tokens": max_tokens} if max_tokens is not None else {}
+    messages = compose_messages(
+        system_prompt=prompts.system_prompt,
+        user_prompt_prefix=user_prompt_prefix,
+        user_prompt_question="",
+        user_prompt_suffix="",
+        user_prompt_extra_content=text,
+    )
+    return llm_client.chat(messages, role="summarization", **params).strip()
+
+
+def _sha256(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
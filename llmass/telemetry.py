@@ -0,0 +1,244 @@
+"""Per-call telemetry of the LLM client.
+
+Every request to the LLM server (and every answer served from the response
+cache) produces an LlmCallRecord. Records are appended to a JSONL log in the
+run dir and aggregated per mode and call kind so that a summary can be printed
+at the end of the run or exported in the Prometheus text format.
+"""
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+import json
+from pathlib import Path
+import statistics
+import threading
+import time
+from typing import Any, Optional, TextIO
+
+from omegaconf import DictConfig
+
+from llmass.utils.console import console
+
+
+_current_mode: ContextVar[str] = ContextVar("llm_call_mode", default="unknown")
+
+
+@contextmanager
+def telemetry_mode(mode: str) -> Iterator[None]:
+    """Attribute the LLM calls made within the context (and the worker threads it starts) to the mode."""
+    token = _current_mode.set(mode)
+    try:
+        yield
+    finally:
+        _current_mode.reset(token)
+
+
+@dataclass
+class LlmCallRecord:
+    kind: str  # chat, stream or embeddings
+    prompt_chars: int
+    total_time_s: float
+    mode: str = field(default_factory=_current_mode.get)
+    backend: Optional[str] = None  # URL of the LLM server the chat request was sent to
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Time not spent by the server on the prompt and the completion (network and waiting for a free slot),
+    # known only if the server reports its timings (llama.cpp)
+    queue_time_s: Optional[float] = None
+    time_to_first_token_s: Optional[float] = None
+    retries: int = 0
+    cache_hit: bool = False
+    error: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+    def update_from_response(self, response_json: dict[str, Any]) -> None:
+        """Fill the token counts and the queue time in from the usage and timings of a response."""
+        usage = response_json.get("usage") or {}
+        timings = response_json.get("timings") or {}
+        self.completion_tokens = usage.get("completion_tokens") or timings.get("predicted_n") or 0
+        if "prompt_ms" in timings and "predicted_ms" in timings:
+            server_time_s = (timings["prompt_ms"] + timings["predicted_ms"]) / 1000
+            self.queue_time_s = max(0.0, self.total_time_s - server_time_s)
+
+
+@dataclass
+class _Aggregate:
+    calls: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_time_s: float = 0.0
+    latencies_s: deque = field(default_factory=lambda: deque(maxlen=Telemetry.max_latencies_per_key))
+
+
+class Telemetry:
+    """Thread-safe collector of the LLM call records."""
+    max_latencies_per_key = 10000  # recent latencies kept per mode and call kind for the percentiles
+
+    def __init__(self, log_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> None:
+        self.log_path = log_path
+        self.prometheus_path = prometheus_path
+        self._aggregates: dict[tuple[str, str], _Aggregate] = {}
+        self._log_file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    def record(self, record: LlmCallRecord) -> None:
+        with self._lock:
+            aggregate = self._aggregates.setdefault((record.mode, record.kind), _Aggregate())
+            aggregate.calls += 1
+            aggregate.cache_hits += record.cache_hit
+            aggregate.errors += record.error is not None
+            aggregate.retries += record.retries
+            aggregate.prompt_tokens += record.prompt_tokens
+            aggregate.cached_prompt_tokens += record.cached_prompt_tokens
+            aggregate.completion_tokens += record.completion_tokens
+            if not record.cache_hit:
+                aggregate.total_time_s += record.total_time_s
+                aggregate.latencies_s.append(record.total_time_s)
+
+            if self.log_path is not None:
+                if self._log_file is None:
+                    Path(self.log_path).parent.mkdir(parents=True, exist_ok=True)
+                    self._log_file = open(self.log_path, "a")
+                self._log_file.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+                self._log_file.flush()
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Return the aggregated records, one row per mode and call kind."""
+        with self._lock:
+            rows = []
+            for (mode, kind), aggregate in sorted(self._aggregates.items()):
+                latencies_s = sorted(aggregate.latencies_s)
+                rows.append({
+                    "mode": mode,
+                    "kind": kind,
+                    "calls": aggregate.calls,
+                    "cache_hits": aggregate.cache_hits,
+                    "errors": aggregate.errors,
+                    "retries": aggregate.retries,
+                    "prompt_tokens": aggregate.prompt_tokens,
+                    "cached_prompt_tokens": aggregate.cached_prompt_tokens,
+                    "completion_tokens": aggregate.completion_tokens,
+                    "total_time_s": aggregate.total_time_s,
+                    "latency_p50_s": _percentile(latencies_s, 0.5),
+                    "latency_p95_s": _percentile(latencies_s, 0.95),
+                })
+            return rows
+
+    def print_summary(self) -> None:
+        rows = self.summary()
+        if not rows:
+            return
+
+        # Imported here, they cost every run of every mode otherwise
+        from rich import box
+        from rich.table import Table
+
+        table = Table(
+            title="LLM calls (hits: response cache hits, time: total latency)",
+            title_style="bold blue",
+            header_style="bold",
+            box=box.SIMPLE,
+            show_edge=False,
+            pad_edge=False,
+            collapse_padding=True,
+        )
+        # Prompt tokens reused from the server KV cache are in the JSONL log and the Prometheus metrics
+        table.add_column("Mode", min_width=max(len(row["mode"]) for row in rows))
+        table.add_column("Kind", min_width=max(len(row["kind"]) for row in rows))
+        for column in ("Calls", "Hits", "Err/retry", "Tok in", "Tok out", "Time, s", "p50/p95, s"):
+            table.add_column(column, justify="right")
+        for row in rows:
+            table.add_row(
+                row["mode"],
+                row["kind"],
+                str(row["calls"]),
+                str(row["cache_hits"]),
+                f"{row['errors']}/{row['retries']}",
+                str(row["prompt_tokens"]),
+                str(row["completion_tokens"]),
+                f"{row['total_time_s']:.1f}",
+                f"{row['latency_p50_s']:.2f}/{row['latency_p95_s']:.2f}",
+            )
+        console.print(table)
+
+    def prometheus_text(self) -> str:
+        """Return the aggregates in the Prometheus text exposition format."""
+        metrics = (
+            ("llmass_llm_calls_total", "calls", "LLM calls, including the ones answered from the response cache"),
+            ("llmass_llm_cache_hits_total", "cache_hits", "LLM calls answered from the response cache"),
+            ("llmass_llm_errors_total", "errors", "LLM calls failed after all the retries"),
+            ("llmass_llm_retries_total", "retries", "Retried requests to the LLM server"),
+            ("llmass_llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent to the LLM server"),
+            ("llmass_llm_cached_prompt_tokens_total", "cached_prompt_tokens", "Prompt tokens reused from the server KV cache"),
+            ("llmass_llm_completion_tokens_total", "completion_tokens", "Completion tokens generated by the LLM server"),
+        )
+        rows = self.summary()
+        lines = []
+        for name, key, description in metrics:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+            lines += [f"{name}{{{_prometheus_labels(row)}}} {row[key]}" for row in rows]
+
+        name = "llmass_llm_call_duration_seconds"
+        lines += [f"# HELP {name} Duration of the LLM calls not answered from the cache", f"# TYPE {name} summary"]
+        for row in rows:
+            labels = _prometheus_labels(row)
+            lines.append(f'{name}{{{labels},quantile="0.5"}} {row["latency_p50_s"]}')
+            lines.append(f'{name}{{{labels},quantile="0.95"}} {row["latency_p95_s"]}')
+            lines.append(f"{name}_sum{{{labels}}} {row['total_time_s']}")
+            lines.append(f"{name}_count{{{labels}}} {row['calls'] - row['cache_hits']}")
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        """Close the JSONL log and write the Prometheus metrics file if it is configured."""
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+        if self.prometheus_path is not None:
+            Path(self.prometheus_path).parent.mkdir(parents=True, exist_ok=True)
+            Path(self.prometheus_path).write_text(self.prometheus_text())
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[round(100 * q) - 1]
+
+
+def _prometheus_labels(row: dict[str, Any]) -> str:
+    return f'mode="{row["mode"]}",kind="{row["kind"]}"'
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry(cfg: DictConfig) -> Optional[Telemetry]:
+    """Return the telemetry shared by the entire application, None if it is disabled."""
+    global _telemetry
+    if not cfg.telemetry.enabled:
+        return None
+
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry(
+                log_path=cfg.telemetry.log_path,
+                prometheus_path=cfg.telemetry.prometheus_path,
+            )
+        return _telemetry
+
+
+def active_telemetry() -> Optional[Telemetry]:
+    """Return the shared telemetry if anything has created it so far."""
+    with _telemetry_lock:
+        return _telemetry
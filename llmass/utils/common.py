@@ -1,5 +1,7 @@
 from pathlib import Path
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from typing import Optional
+from rich.live import Live
 from rich.panel import Panel
 
 from llmass.utils.console import console
@@ -53,6 +55,28 @@ def print_llm_output(llm_output: str) -> None:
     console.print()
 
 
+def print_llm_output_streaming(
+    llm_output_chunks: Iterable[str],
+    stats: Optional[Callable[[], str]] = None,
+) -> str:
+    """Render the LLM output chunk by chunk while it is being generated.
+
+    If stats is given, its result is shown as the panel subtitle once the
+    generation is over.
+    """
+    llm_output = ""
+    console.print()
+    with Live(Panel(llm_output, border_style="green"), console=console, refresh_per_second=15) as live:
+        for chunk in llm_output_chunks:
+            llm_output += chunk
+            live.update(Panel(llm_output, border_style="green"))
+        subtitle = stats() if stats is not None else None
+        live.update(Panel(llm_output, border_style="green", subtitle=subtitle, subtitle_align="right"))
+    console.print()
+
+    return llm_output
+
+
 def to_boolean(llm_output: str) -> bool:
     s = llm_output.lower()
     if s.startswith("yes") or s.startswith("true"):
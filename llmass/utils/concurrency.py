@@ -0,0 +1,50 @@
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
+from typing import Any, Optional, TypeVar
+
+from rich.progress import Progress
+
+from llmass.utils.console import console
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_concurrently(
+    func: Callable[[T], R],
+    items: Sequence[T],
+    max_workers: int,
+    description: Optional[str] = None,
+) -> list[R]:
+    """Apply func to every item using a bounded thread pool.
+
+    Results are returned in the order of items regardless of the completion
+    order. If description is given, a progress bar is shown and advances as
+    soon as any item is done. func runs in a copy of the caller's context
+    (e.g., the mode the LLM calls are attributed to).
+    """
+    results: list[Any] = [None] * len(items)
+    if not items:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, func, item): i for i, item in enumerate(items)
+        }
+        try:
+            if description is None:
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+            else:
+                with Progress(console=console) as progress:
+                    task = progress.add_task(description, total=len(items))
+                    for future in as_completed(futures):
+                        results[futures[future]] = future.result()
+                        progress.advance(task)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return results
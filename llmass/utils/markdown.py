@@ -1,8 +1,12 @@
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 from typing import Any, Union
 import re
 
 
+MAX_HEADER_LEVEL = 3  # deeper headers are treated as plain text
+
+
 class MdParser:
     subparsers = {
         "table": "_parse_table",
@@ -23,14 +27,15 @@ class MdParser:
         with open(self.path_to_md, "r") as f:
             block_name = None
             lines_buf = []
-            for l in f.readlines():
+            for l in f:  # the file is read lazily, line by line
                 if l.strip() == "":  # empty line
                     continue
 
-                if starts_with_n_hashes_exactly(l, 1):  # title, skip it
+                header_level = get_header_level(l)
+                if header_level == 1:  # title, skip it
                     continue
 
-                if starts_with_n_hashes_exactly(l, 2):  # new content block
+                if header_level == 2:  # new content block
                     if block_name:  # process all the previous lines
                         subparser = self.subparsers[self.schema[block_name]]
                         content[block_name] = getattr(self, subparser)(lines_buf)
@@ -49,24 +54,13 @@ class MdParser:
 
         return content
 
+    def iter_sections(self) -> Iterator[dict[str, str]]:
+        """Lazily yield sections of the file split by headers of any level."""
+        with open(self.path_to_md, "r") as f:
+            yield from iter_sections(f)
+
     def _parse_table(self, lines: list[str]) -> list[dict[str, str]]:
-        res = []
-
-        # First line defines the columns
-        # Second line is merely a separator
-        columns = parse_values_from_table_row(lines[0])
-
-        # All the next lines are the actual content
-        for row in lines[2:]:
-            vals = parse_values_from_table_row(row)
-            if len(columns) != len (vals):
-                raise ValueError(f"Markdown table is broken at line\n{row}")
-
-            res.append({})
-            for col, val in zip(columns, vals):
-                res[-1][col] = val
-        
-        return res
+        return list(iter_table_rows(lines))
 
     def _parse_dated_notes(self, lines: list[str]) -> dict[str, str]:
         res = {}
@@ -74,7 +68,7 @@ class MdParser:
         date = None
 
         for l in lines:
-            if starts_with_n_hashes_exactly(l, 3):  # new date
+            if get_header_level(l) == 3:  # new date
                 if date:  # process all the previous lines
                     res[date] = "\n".join(lines_buf)
                     lines_buf = []
@@ -90,32 +84,77 @@ class MdParser:
 
     def _parse_for_search(self, lines: list[str]) -> list[dict[str, str]]:
         """Parse markdown content into sections by headers of any level."""
-        sections = []
-        current_header = None
-        current_content = []
-        
-        for line in lines:
-            header_level = get_header_level(line)
-            
-            if header_level > 0:  # This is a header
-                if current_header:  # Save previous section
-                    sections.append({
-                        "header": current_header,
-                        "content": "\n".join(current_content).strip()
-                    })
-                current_header = line.strip()
-                current_content = []
-            else:
-                current_content.append(line)
-        
-        # Add the last section
-        if current_header and current_content:
-            sections.append({
-                "header": current_header,
-                "content": "\n".join(current_content).strip()
-            })
-            
-        return sections
+        return list(iter_sections(lines))
+
+
+def iter_table_rows(lines: Iterable[str]) -> Iterator[dict[str, str]]:
+    lines = iter(lines)
+
+    # First line defines the columns
+    # Second line is merely a separator
+    header = next(lines, None)
+    if header is None:  # empty table
+        return
+    columns = parse_values_from_table_row(header)
+    next(lines, None)
+
+    # All the next lines are the actual content
+    for row in lines:
+        vals = parse_values_from_table_row(row)
+        if len(columns) != len (vals):
+            raise ValueError(f"Markdown table is broken at line\n{row}")
+
+        yield dict(zip(columns, vals))
+
+
+def iter_sections(lines: Iterable[str]) -> Iterator[dict[str, str]]:
+    """Yield sections split by headers of any level. Each line is classified exactly once."""
+    current_header = None
+    current_content = []
+    
+    for line in lines:
+        if get_header_level(line) > 0:  # This is a header
+            if current_header:  # Yield previous section
+                yield {
+                    "header": current_header,
+                    "content": "\n".join(current_content).strip()
+                }
+            current_header = line.strip()
+            current_content = []
+        else:
+            current_content.append(line)
+    
+    # Yield the last section
+    if current_header and current_content:
+        yield {
+            "header": current_header,
+            "content": "\n".join(current_content).strip()
+        }
+
+
+def iter_section_spans(buf: bytes) -> Iterator[tuple[int, int, int]]:
+    """Yield (header_start, content_start, content_end) byte offsets of the sections of raw markdown.
+
+    Sections are the same as the ones produced by iter_sections but only the
+    header markers are looked at, so buf can be a memory-mapped file which is
+    never decoded as a whole.
+    """
+    header_start = None
+    content_start = None
+    for m in _HEADER_MARKER_PATTERN.finditer(buf):
+        if len(m.group(1)) > MAX_HEADER_LEVEL:
+            continue
+
+        if header_start is not None:
+            yield header_start, content_start, m.start()
+
+        header_start = m.start()
+        line_end = buf.find(b"\n", m.end())
+        content_start = len(buf) if line_end == -1 else line_end + 1
+
+    # The last section is kept only if there is at least one line after its header
+    if header_start is not None and content_start < len(buf):
+        yield header_start, content_start, len(buf)
 
 
 def parse_name_from_header(
@@ -125,7 +164,7 @@ def parse_name_from_header(
     res = raw_header.strip(" #\t\n").lower()
 
     if replace_whitespaces_with_underscores:
-        res = re.sub(r"\s+", "_", res)
+        res = _WHITESPACES_PATTERN.sub("_", res)
 
     return res
 
@@ -134,14 +173,23 @@ def parse_values_from_table_row(raw_row: str) -> str:
     return list(map(lambda s: s.strip(), raw_row.split("|")[1:-1:]))
 
 
-
 def starts_with_n_hashes_exactly(s: str, n: int) -> bool:
-    return re.match(r"^\s*" + "#"*n + r"(?!\#)", s)
+    return _count_leading_hashes(s) == n
+
 
 def get_header_level(line: str) -> int:
     """Return header level (1-3) or 0 if not a header"""
-    for i in range(1, 4):
-        if starts_with_n_hashes_exactly(line, i):
-            return i
-    return 0
+    n_hashes = _count_leading_hashes(line)
+    return n_hashes if n_hashes <= MAX_HEADER_LEVEL else 0
+
+
+_WHITESPACES_PATTERN = re.compile(r"\s+")
+_HEADER_MARKER_PATTERN = re.compile(rb"^[ \t\f\v]*(#+)", re.MULTILINE)
+
 
+def _count_leading_hashes(s: str) -> int:
+    """Return the length of the run of hashes following the leading whitespaces."""
+    stripped = s.lstrip()
+    if not stripped.startswith("#"):
+        return 0
+    return len(stripped) - len(stripped.lstrip("#"))
@@ -0,0 +1,34 @@
+import random
+from collections.abc import Sequence
+from typing import Optional
+
+
+class AliasSampler:
+    """Sampler of indices with given weights, O(n) to build and O(1) per sample (Vose's alias method)."""
+    def __init__(self, weights: Sequence[float], rng: Optional[random.Random] = None) -> None:
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("At least one positive weight is required")
+
+        self._rng = rng or random.Random()
+        self._prob = [0.0] * n
+        self._alias = list(range(n))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:  # left with probability 1 up to rounding errors
+            self._prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self._prob)
+
+    def sample(self) -> int:
+        i = self._rng.randrange(len(self._prob))
+        return i if self._rng.random() < self._prob[i] else self._alias[i]
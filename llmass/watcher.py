@@ -0,0 +1,185 @@
+"""Watching the markdown files of a collection for changes.
+
+The watcher uses watchdog (inotify, FSEvents, ReadDirectoryChangesW) when it is
+installed and otherwise polls the mtime and size of the files every
+poll_interval_s. Touched files are collected until no change has been seen for
+debounce_s, so a burst of saves (an editor writing a temporary file and
+renaming it, a git checkout, a sync client) ends up in a single update.
+"""
+from collections.abc import Callable
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Optional
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency, polling is used without it
+    FileSystemEventHandler = object
+    Observer = None
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CollectionWatcher:
+    """Collects the relative paths of the touched markdown files under root.
+
+    on_change is called from a background thread once the changes settle and
+    is expected to call take_pending and to record the paths again if it fails
+    to apply them, so that they are retried. Consumers that cannot wait for
+    the changes to settle (e.g., a query) call take_pending themselves.
+    """
+    def __init__(
+        self,
+        root: os.PathLike,
+        on_change: Callable[[], None],
+        debounce_s: float = 1.0,
+        poll_interval_s: float = 2.0,
+        excluded_filenames: tuple[str, ...] = ("definitions.md",),
+        use_watchdog: bool = True,
+    ) -> None:
+        self.root = Path(root)
+        self.on_change = on_change
+        self.debounce_s = debounce_s
+        self.poll_interval_s = poll_interval_s
+        self.excluded_filenames = excluded_filenames
+        self.use_watchdog = use_watchdog and Observer is not None
+        self._pending: set[str] = set()
+        self._rescan = False
+        self._last_change = 0.0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._observer = None
+
+    def start(self) -> None:
+        if self.use_watchdog:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), str(self.root), recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            snapshot = self._snapshot()  # taken right away not to miss the changes made while the thread starts
+            self._threads.append(threading.Thread(target=self._poll, args=(snapshot,), daemon=True))
+        self._threads.append(threading.Thread(target=self._notify_settled_changes, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        LOGGER.info(f"Watching {self.root} for changes ({'watchdog' if self.use_watchdog else 'polling'})")
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join()
+
+    def take_pending(self) -> Optional[set[str]]:
+        """Return the relative paths touched since the last call, or None if the whole collection must be rescanned.
+
+        The latter happens when a directory is created, moved or deleted since
+        its files are not reported one by one.
+        """
+        with self._cond:
+            pending = None if self._rescan else self._pending
+            self._pending = set()
+            self._rescan = False
+            return pending
+
+    def record(self, rel_paths: set[str], rescan: bool = False) -> None:
+        with self._cond:
+            self._pending |= rel_paths
+            self._rescan |= rescan
+            self._last_change = time.monotonic()
+            self._cond.notify_all()
+
+    def relative_md_path(self, path: str) -> Optional[str]:
+        p = Path(path)
+        if p.suffix != ".md" or p.name in self.excluded_filenames:
+            return None
+        try:
+            return str(p.relative_to(self.root))
+        except ValueError:
+            return None
+
+    def _has_pending(self) -> bool:
+        return self._rescan or bool(self._pending)
+
+    def _notify_settled_changes(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped and not self._has_pending():
+                    self._cond.wait()
+                if self._stopped:
+                    return
+
+                remaining_s = self._last_change + self.debounce_s - time.monotonic()
+                if remaining_s > 0:
+                    self._cond.wait(remaining_s)
+                    continue
+
+            try:
+                self.on_change()
+            except Exception:
+                LOGGER.exception(f"Cannot apply the changes of {self.root}, retrying after the next debounce period")
+
+    def _poll(self, snapshot: dict[str, tuple[int, int]]) -> None:
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._stopped, timeout=self.poll_interval_s):
+                    return
+
+            try:
+                new_snapshot = self._snapshot()
+            except OSError as e:  # e.g., a directory removed during the walk
+                LOGGER.warning(f"Cannot poll {self.root} for changes: {e!r}")
+                continue
+
+            touched = {
+                rel_path for rel_path in snapshot.keys() | new_snapshot.keys()
+                if snapshot.get(rel_path) != new_snapshot.get(rel_path)
+            }
+            snapshot = new_snapshot
+            if touched:
+                self.record(touched)
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for p in self.root.rglob("*.md"):
+            if p.name in self.excluded_filenames:
+                continue
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[str(p.relative_to(self.root))] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+
+class _EventHandler(FileSystemEventHandler):
+    ignored_event_types = ("opened", "closed_no_write")
+
+    def __init__(self, watcher: CollectionWatcher) -> None:
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event: "FileSystemEvent") -> None:
+        if event.event_type in self.ignored_event_types:
+            return
+
+        if event.is_directory:
+            # Files moved in or out with a directory are not reported one by one
+            if event.event_type in ("created", "deleted", "moved"):
+                self.watcher.record(set(), rescan=True)
+            return
+
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        rel_paths = {rel_path for rel_path in map(self.watcher.relative_md_path, paths) if rel_path is not None}
+        if rel_paths:
+            self.watcher.record(rel_paths)
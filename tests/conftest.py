@@ -0,0 +1,19 @@
+import pytest
+from hydra import compose, initialize_config_dir
+
+from llmass.utils.common import get_config_path
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    """Config with the caches under tmp_path and no response cache or telemetry."""
+    with initialize_config_dir(config_dir=str(get_config_path()), version_base="1.3"):
+        return compose(
+            config_name="config_llm_runner",
+            overrides=[
+                f"user_settings.project_path={tmp_path}",
+                f"user_settings.cache_dir={tmp_path / 'cache'}",
+                "response_cache.enabled=false",
+                "telemetry.enabled=false",
+            ],
+        )
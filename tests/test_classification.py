@@ -0,0 +1,29 @@
+from omegaconf import OmegaConf
+import pytest
+
+from llmass.classification import classification_params, parse_verdict, parse_verdicts
+
+
+def test_parse_verdicts():
+    assert parse_verdicts('["yes", "no", true]', 3) == [True, False, True]
+    assert parse_verdicts('Verdicts: ["yes", "no"]', 2) == [True, False]
+    assert parse_verdicts('{"verdicts": ["no", "yes"]}', 2) == [False, True]
+    assert parse_verdicts('["yes"]', 2) is None
+    assert parse_verdicts('{"verdicts": "yes"}', 1) is None
+    assert parse_verdicts("yes, no", 2) is None
+
+
+@pytest.mark.parametrize("n_items", [None, 3])
+def test_json_schema_constraint_has_an_object_root(n_items):
+    decoding = OmegaConf.create({"constraint": "json_schema", "max_tokens": 2, "logprobs": False, "top_logprobs": 0})
+    params = classification_params(decoding, n_items)
+    schema = params["response_format"]["json_schema"]["schema"]
+    assert schema["type"] == "object" and schema["additionalProperties"] is False
+    assert schema["required"] == list(schema["properties"])
+
+    # The answers matching the schema are parsed and fit max_tokens
+    if n_items is None:
+        assert parse_verdict('{"verdict": "yes"}') is True
+    else:
+        assert parse_verdicts('{"verdicts": ["yes", "no", "no"]}', n_items) == [True, False, False]
+    assert params["max_tokens"] >= 8
@@ -0,0 +1,22 @@
+from llmass.collection import MarkdownCollection
+
+
+def test_iter_contents_matches_content(tmp_path):
+    root = tmp_path / "notes"
+    root.mkdir()
+    (root / "a.md").write_text("# Alpha\n\nFirst\n\n# Beta\n\nSecond\n")
+    (root / "b.md").write_text("# Gamma\n\nThird\n")
+    (root / "c.md").write_text("# Delta\n\nFourth\n")
+    collection = MarkdownCollection(root, tmp_path / "cache", n_workers=1)
+    collection.refresh()
+    sections = collection.sections()
+
+    # Changed and deleted since the collection was refreshed
+    (root / "a.md").write_text("# Intro\n\n# Beta\n\nSecond, edited\n\n# Alpha\n\nFirst\n")
+    (root / "c.md").unlink()
+
+    expected = [sections.content(i) for i in range(len(sections))]
+    assert expected == ["First", "Second, edited", "Third", ""]
+    assert dict(sections.iter_contents()) == dict(enumerate(expected))
+    assert [section["content"] for section in sections.get_many([3, 0, 2])] == ["", "First", "Third"]
+    assert dict(sections.iter_texts([2])) == {2: "# Gamma\n\nThird"}
@@ -0,0 +1,66 @@
+from collections import Counter
+import threading
+
+import pytest
+
+from benchmarks.bench_modes import compose_config
+from benchmarks.fixtures import generate_rss_feeds
+from benchmarks.mock_llm_server import MockLlmServer
+from llmass.client import LlmClient
+from llmass.papers import PaperQueue, SeenPaperStore, run_recent_papers_pipeline
+
+
+@pytest.fixture(scope="module")
+def mock_server():
+    server = MockLlmServer(latency_s=0.02, tokens_per_second=None, max_concurrent_requests=8)
+    server.start_in_background()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_unget_puts_the_paper_back_ahead_of_the_close_markers():
+    paper_queue = PaperQueue()
+    paper_queue.put({"arxiv_id": "1"})
+    paper = paper_queue.get()
+    paper_queue.close(2)
+    paper_queue.unget(paper)
+    assert paper_queue.get() is paper
+    assert paper_queue.get() is None
+
+
+@pytest.mark.parametrize("batching_enabled", [True, False])
+def test_every_queued_paper_is_classified_exactly_once(tmp_path, mock_server, batching_enabled):
+    cfg = compose_config(tmp_path, [mock_server], tmp_path)
+    cfg.batch_classification.enabled = batching_enabled
+    # Papers overflowing the budget go back to the queue, after it is closed as the feeds are fetched quickly
+    cfg.batch_classification.context_token_budget = 1000
+    feeds = generate_rss_feeds(tmp_path / "feeds", n_papers=300)
+    seen_paper_store = SeenPaperStore(str(tmp_path / "seen.sqlite"))
+    question = cfg.prompts.recent_papers.user_prompt_question_at_startup
+    queued, classified = [], Counter()
+    lock = threading.Lock()
+
+    def on_paper_queued(paper):
+        queued.append(paper["arxiv_id"])
+
+    def on_paper_classified(paper, relevant):
+        assert 0.0 <= paper["relevance"] <= 1.0
+        with lock:
+            classified[paper["arxiv_id"]] += 1
+
+    run_recent_papers_pipeline(
+        rss_feed_urls=[feed.as_uri() for feed in feeds],
+        llm_client=LlmClient.from_config(cfg),
+        prompts=cfg.prompts.recent_papers,
+        batching=cfg.batch_classification,
+        n_workers=4,
+        on_paper_queued=on_paper_queued,
+        on_paper_classified=on_paper_classified,
+        seen_paper_store=seen_paper_store,
+        decoding=cfg.classification,
+    )
+
+    assert len(queued) == len(set(queued)) > 0
+    assert classified == Counter(queued)
+    assert all(seen_paper_store.is_judged({"arxiv_id": arxiv_id, "version": None}, question) for arxiv_id in queued)
@@ -0,0 +1,145 @@
+import math
+
+import pytest
+import requests
+
+from llmass.routing import Backend, BackendPool, parse_backends
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_pool(*backends: Backend, health_check=None, eject_after_failures: int = 2, eject_s: float = 10.0):
+    clock = FakeClock()
+    pool = BackendPool(
+        list(backends),
+        eject_after_failures=eject_after_failures,
+        eject_s=eject_s,
+        health_check=health_check,
+        clock=clock,
+    )
+    return pool, clock
+
+
+def fail(pool: BackendPool, backend: Backend, n: int) -> None:
+    others = [other.url for other in pool.backends if other is not backend]
+    for _ in range(n):
+        pool.release(pool.acquire("interactive", exclude=others), requests.ConnectionError())
+
+
+def test_parse_backends():
+    assert parse_backends("http://a") == [Backend(url="http://a")]
+    backends = parse_backends(["http://a", {"url": "http://b", "weight": 2, "roles": ["classification"]}])
+    assert backends[1] == Backend(url="http://b", weight=2.0, roles=("classification",))
+    with pytest.raises(ValueError):
+        parse_backends([{"url": "http://a", "roles": ["unknown"]}])
+    with pytest.raises(ValueError):
+        parse_backends([{"url": "http://a", "weight": 0}])
+    with pytest.raises(ValueError):
+        parse_backends([])
+
+
+def test_acquire_balances_outstanding_requests_by_weight():
+    a, b = Backend("http://a"), Backend("http://b", weight=2.0)
+    pool, _ = make_pool(a, b)
+    acquired = [pool.acquire("interactive").url for _ in range(3)]
+    assert sorted(acquired) == ["http://a", "http://b", "http://b"]
+    assert (a.outstanding, b.outstanding) == (1, 2)
+
+    pool.release(b)
+    pool.release(b)
+    assert pool.acquire("interactive") is b
+
+
+def test_roles():
+    a, b = Backend("http://a", roles=("classification",)), Backend("http://b")
+    pool, _ = make_pool(a, b)
+    assert all(pool.acquire("interactive") is b for _ in range(3))
+    for _ in range(3):
+        pool.release(b)
+    assert {pool.acquire("classification").url for _ in range(2)} == {"http://a", "http://b"}
+    assert pool.cache_namespace("interactive") == "http://b"
+
+
+def test_ejected_after_consecutive_failures_and_back_after_eject_s():
+    a, b = Backend("http://a"), Backend("http://b")
+    pool, clock = make_pool(a, b, eject_after_failures=2, eject_s=10.0)
+    fail(pool, a, 1)
+    pool.release(pool.acquire("interactive", exclude=["http://b"]))  # a success resets the count
+    fail(pool, a, 1)
+    assert a.is_healthy(clock())
+
+    fail(pool, a, 1)
+    assert not a.is_healthy(clock())
+    assert all(pool.acquire("interactive") is b for _ in range(3))
+    assert not pool.has_alternative("interactive", exclude=["http://b"])
+
+    clock.now = 10.0
+    assert a.is_healthy(clock())
+    assert pool.acquire("interactive") is a
+    # Still down: ejected again by the first failure
+    pool.release(a, requests.ConnectionError())
+    assert not a.is_healthy(clock())
+
+
+def test_client_errors_do_not_eject():
+    a, b = Backend("http://a"), Backend("http://b")
+    pool, clock = make_pool(a, b, eject_after_failures=1)
+    response = requests.Response()
+    response.status_code = 400
+    pool.release(pool.acquire("interactive", exclude=["http://b"]), requests.HTTPError(response=response))
+    assert a.is_healthy(clock())
+
+
+def test_single_backend_is_never_ejected():
+    a = Backend("http://a")
+    pool, clock = make_pool(a, eject_after_failures=1)
+    fail(pool, a, 5)
+    assert a.is_healthy(clock())
+
+
+def test_falls_back_to_the_backend_coming_back_soonest_when_all_are_ejected():
+    a, b = Backend("http://a"), Backend("http://b")
+    pool, clock = make_pool(a, b, eject_after_failures=1, eject_s=10.0)
+    fail(pool, a, 1)
+    clock.now = 5.0
+    fail(pool, b, 1)
+    assert not a.is_healthy(clock()) and not b.is_healthy(clock())
+    assert pool.acquire("interactive") is a
+    with pytest.raises(ValueError):
+        pool.acquire("interactive", exclude=["http://a", "http://b"])
+
+
+def test_health_check_brings_ejected_backends_back():
+    healthy = {"http://a": False}
+    a, b = Backend("http://a"), Backend("http://b")
+    pool, clock = make_pool(
+        a, b, health_check=lambda backend: healthy[backend.url], eject_after_failures=1, eject_s=1e6
+    )
+    fail(pool, a, 1)
+    assert a.ejected_until == math.inf
+
+    clock.now = 1e9  # no expiry with a health check
+    pool.check_ejected_backends()
+    assert not a.is_healthy(clock())
+
+    healthy["http://a"] = True
+    pool.check_ejected_backends()
+    assert a.is_healthy(clock())
+    assert a.consecutive_failures == 0
+
+
+def test_failing_health_check_keeps_the_backend_ejected():
+    def health_check(backend: Backend) -> bool:
+        raise requests.ConnectionError()
+
+    a, b = Backend("http://a"), Backend("http://b")
+    pool, clock = make_pool(a, b, health_check=health_check, eject_after_failures=1, eject_s=1e6)
+    fail(pool, a, 1)
+    pool.check_ejected_backends()
+    assert not a.is_healthy(clock())
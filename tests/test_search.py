@@ -0,0 +1,84 @@
+import hashlib
+import time
+
+import pytest
+import requests
+
+from llmass.collection import MarkdownCollection
+from llmass.embedding_index import EmbeddingIndex
+from llmass.search import SearchableCollection
+
+
+class FlakyEmbedder:
+    """Embeds texts by their hash, failing the section (not query) requests while fail_sections is set."""
+    def __init__(self) -> None:
+        self.fail_sections = False
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if self.fail_sections and any(text.startswith("#") for text in texts):
+            self.fail_sections = False
+            raise requests.ConnectionError("embedding server is down")
+        return [[b / 255 for b in hashlib.sha256(text.encode("utf-8")).digest()[:8]] for text in texts]
+
+
+@pytest.fixture
+def notes(tmp_path):
+    root = tmp_path / "notes"
+    root.mkdir()
+    (root / "a.md").write_text("# Alpha\n\nFirst section\n\n# Beta\n\nSecond section\n")
+    return root
+
+
+@pytest.fixture
+def searchable_collection(tmp_path, cfg, notes):
+    cfg.search.ranker = "embeddings"
+    embedder = FlakyEmbedder()
+    searchable_collection = SearchableCollection(
+        "notes",
+        MarkdownCollection(notes, tmp_path / "cache" / "collection"),
+        EmbeddingIndex(tmp_path / "cache" / "embeddings"),
+        embedder,
+        cfg,
+    )
+    searchable_collection.refresh()
+    return searchable_collection, embedder
+
+
+def index_in_sync(searchable_collection):
+    sections = searchable_collection.collection.sections()
+    return [m["sha256"] for m in searchable_collection.index.metadata] == sections.hashes
+
+
+def wait_for(condition, timeout_s=5.0):
+    deadline = time.monotonic() + timeout_s
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_failed_index_update_is_retried_by_the_next_refresh(notes, searchable_collection):
+    searchable_collection, embedder = searchable_collection
+    (notes / "a.md").write_text("# Alpha\n\nFirst section, edited\n\n# Gamma\n\nThird section\n")
+    embedder.fail_sections = True
+    with pytest.raises(requests.ConnectionError):
+        searchable_collection.candidates("section")
+
+    # The collection has no changes left, the index is updated anyway
+    results = searchable_collection.search("section", verify_with_llm=False)
+    assert sorted(section["header"] for section in results) == ["# Alpha", "# Gamma"]
+    assert index_in_sync(searchable_collection)
+
+
+def test_failed_index_update_is_retried_by_the_watcher(notes, searchable_collection):
+    searchable_collection, embedder = searchable_collection
+    searchable_collection.watch(debounce_s=0.05, poll_interval_s=0.05)
+    try:
+        embedder.fail_sections = True
+        (notes / "a.md").write_text("# Alpha\n\nFirst section, edited\n\n# Gamma\n\nThird section\n")
+
+        # The first update fails and the watcher applies the changes again after the next debounce period
+        wait_for(lambda: not embedder.fail_sections and index_in_sync(searchable_collection))
+        results = searchable_collection.search("section", verify_with_llm=False)
+        assert sorted(section["header"] for section in results) == ["# Alpha", "# Gamma"]
+    finally:
+        searchable_collection.close()